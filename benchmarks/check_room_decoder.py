@@ -0,0 +1,195 @@
+"""
+快速房间帧解码（room_frame.py）与 ws_pb2 完整解析的差分检查。
+
+对每一帧分别用两种方式取出座位列表 (name, emoji)，要求结果一致：
+快速解码成功时必须与 ws_pb2 相同；ws_pb2 判定为无效帧时快速解码不能给出房间数据，
+返回 None 是允许的，因为快速解码不检查用不到的字段，两种结果对调用方都表示“不是房间帧”；
+快速解码失败只会退回完整解析，单独计数但不算错误。
+
+帧来源为按种子随机生成的 WsData（含大块 gameData、未知字段、多段 room 合并、截断帧等），
+也可以用 --frames 指定目录，读取其中抓取保存的 *.bin 原始帧（scripts/capture_room_frames.py 抓取）。
+tests/test_room_decoder.py 用同样的比较检查 tests/fixtures/room_frames 中的帧。
+
+    python benchmarks/check_room_decoder.py --count 5000 --frames tests/fixtures/room_frames
+"""
+import argparse
+import random
+import sys
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from google.protobuf.message import DecodeError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_hullqin import load_utils_module, ws_pb2  # noqa: E402
+
+room_frame = load_utils_module("hullqin_room_frame", "room_frame.py")
+
+Seats = Optional[List[Tuple[str, bytes]]]
+NAMES = ["", "玩家A", " 空格 ", "Bob", "🎲骰子", "a" * 64, "​"]
+EMOJIS = [b"", "😀".encode(), b"\xff\xfe", " 🐱 ".encode()]
+
+
+def _random_bytes(rng: random.Random, size: int) -> bytes:
+    return rng.randbytes(size) if size else b""
+
+
+def _random_room(rng: random.Random, msg) -> None:
+    room = msg.room
+    room.time = rng.getrandbits(40)
+    room.state = rng.randrange(4)
+    room.id = "".join(rng.choice("abcdefghjk0123456789") for _ in range(4))
+    for i in range(rng.randrange(0, 10)):
+        player = room.playerList.add()
+        name = rng.choice(NAMES)
+        if name:
+            player.name = name
+        emoji = rng.choice(EMOJIS)
+        if emoji:
+            player.emoji = emoji
+        player.state = i
+        player.offline = rng.random() < 0.2
+        player.imgUrl = rng.choice(["", "https://example.invalid/a.png"])
+    if rng.random() < 0.5:
+        room.gameData = _random_bytes(rng, rng.choice([0, 16, 4096, 128 * 1024]))
+        for _ in range(rng.randrange(0, 6)):
+            player_data = room.playersData.add()
+            player_data.time = rng.getrandbits(32)
+            player_data.data = _random_bytes(rng, rng.randrange(0, 2048))
+    room.visitorCount = rng.randrange(100)
+
+
+def _unknown_field(rng: random.Random) -> bytes:
+    """构造 schema 中不存在的字段，两种解析都应忽略"""
+    field = rng.choice([4, 15, 100, 2047])
+    wire = rng.choice([0, 1, 2, 5])
+    key = bytes(_varint((field << 3) | wire))
+    if wire == 0:
+        return key + bytes(_varint(rng.getrandbits(35)))
+    if wire == 1:
+        return key + _random_bytes(rng, 8)
+    if wire == 5:
+        return key + _random_bytes(rng, 4)
+    payload = _random_bytes(rng, rng.randrange(0, 64))
+    return key + bytes(_varint(len(payload))) + payload
+
+
+def _varint(value: int) -> Iterator[int]:
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            yield byte | 0x80
+        else:
+            yield byte
+            return
+
+
+def generate_frames(count: int, seed: int) -> Iterator[Tuple[str, bytes]]:
+    rng = random.Random(seed)
+    for i in range(count):
+        msg = ws_pb2.WsData()
+        kind = rng.random()
+        if kind < 0.7:
+            _random_room(rng, msg)
+        elif kind < 0.85:
+            msg.event.key = rng.randrange(10)
+            msg.event.data = _random_bytes(rng, rng.randrange(0, 32))
+        else:
+            msg.party.games = "uno,lrs"
+            msg.party.visitorCount = rng.randrange(50)
+        frame = msg.SerializeToString()
+
+        mutation = rng.random()
+        if mutation < 0.1:
+            # 两段 room 拼接，protobuf 会合并为一个 room，playerList 依次追加
+            other = ws_pb2.WsData()
+            _random_room(rng, other)
+            frame += other.SerializeToString()
+            yield f"generated-{i}-merged", frame
+        elif mutation < 0.2:
+            yield f"generated-{i}-unknown", _unknown_field(rng) + frame + _unknown_field(rng)
+        elif mutation < 0.3 and frame:
+            yield f"generated-{i}-truncated", frame[: rng.randrange(len(frame))]
+        elif mutation < 0.33:
+            yield f"generated-{i}-garbage", _random_bytes(rng, rng.randrange(1, 64))
+        else:
+            yield f"generated-{i}", frame
+
+
+def recorded_frames(directory: Path) -> Iterator[Tuple[str, bytes]]:
+    for path in sorted(directory.glob("*.bin")):
+        yield path.name, path.read_bytes()
+
+
+def decode_full(frame: bytes) -> Seats:
+    msg = ws_pb2.WsData()
+    msg.ParseFromString(frame)
+    if not msg.HasField("room"):
+        return None
+    return [(player.name, bytes(player.emoji)) for player in msg.room.playerList]
+
+
+FAST = "fast"
+FALLBACK = "fallback"
+MISMATCH = "mismatch"
+
+
+def compare(frame: bytes) -> Tuple[str, str]:
+    """比较一帧的两种解码结果，返回 (FAST | FALLBACK | MISMATCH, 说明)"""
+    try:
+        expected: Seats = decode_full(frame)
+        full_valid = True
+    except DecodeError:
+        expected = None
+        full_valid = False
+
+    try:
+        actual = room_frame.decode_room_players(frame)
+    except (room_frame.FrameDecodeError, UnicodeDecodeError) as e:
+        return FALLBACK, repr(e)
+
+    if not full_valid:
+        if actual is None:
+            return FAST, "ws_pb2 与快速解码均判定为非房间帧"
+        return MISMATCH, f"ws_pb2 判定为无效帧，快速解码却返回了 {actual!r}"
+    if actual != expected:
+        return MISMATCH, f"期望 {expected!r}，实际 {actual!r}"
+    return FAST, ""
+
+
+def check(frames: Iterator[Tuple[str, bytes]]) -> int:
+    total = fast_ok = fallbacks = 0
+    mismatches: List[str] = []
+    for name, frame in frames:
+        total += 1
+        status, detail = compare(frame)
+        if status == FAST:
+            fast_ok += 1
+        elif status == FALLBACK:
+            fallbacks += 1
+        else:
+            mismatches.append(f"{name}: {detail}")
+
+    print(f"共 {total} 帧：快速解码一致 {fast_ok}，退回完整解析 {fallbacks}，不一致 {len(mismatches)}")
+    for mismatch in mismatches[:20]:
+        print("  " + mismatch)
+    return 1 if mismatches else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="房间帧快速解码差分检查")
+    parser.add_argument("--count", type=int, default=2000, help="随机生成的帧数量")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--frames", type=Path, help="抓取保存的 *.bin 原始帧所在目录")
+    args = parser.parse_args()
+
+    frames = generate_frames(args.count, args.seed)
+    if args.frames:
+        frames = (frame for source in (recorded_frames(args.frames), frames) for frame in source)
+    sys.exit(check(frames))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+本地 hullqin 替身服务，用于离线测试与性能测试。
+
+提供首页、app/index chunk 以及房间 websocket，房间会推送用 ws_pb2 构造的 WsData 帧，
+可注入延迟与失败。
+
+单独运行：
+
+    python benchmarks/fake_hullqin.py --port 8765 --games 120 --latency 0.05 --failure-rate 0.1
+
+然后在 .env 中设置：
+
+    HULLQIN_HOME_URL=http://127.0.0.1:8765/
+    HULLQIN_WS_URL=ws://127.0.0.1:8765/
+"""
+import argparse
+import asyncio
+import hashlib
+import importlib.util
+import random
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from aiohttp import WSCloseCode, web
+
+UTILS_PATH = Path(__file__).resolve().parent.parent / "nonebot_plugin_hullqin_game" / "utils"
+
+
+def load_utils_module(name: str, filename: str):
+    """直接按路径加载插件 utils 下不依赖 nonebot 的模块，避免导入插件包时初始化 nonebot"""
+    spec = importlib.util.spec_from_file_location(name, UTILS_PATH / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_ws_pb2():
+    return load_utils_module("hullqin_ws_pb2", "ws_pb2.py")
+
+
+ws_pb2 = load_ws_pb2()
+
+
+def build_room_frame(
+    room_id: str,
+    total: int,
+    names: List[str],
+    game_data_size: int = 0,
+    rng: random.Random = random.Random(0),
+) -> bytes:
+    """构造房间帧，names 中为空字符串的位置视为空位"""
+    msg = ws_pb2.WsData()
+    msg.room.id = room_id
+    msg.room.state = 1
+    for i in range(total):
+        player = msg.room.playerList.add()
+        name = names[i] if i < len(names) else ""
+        if name:
+            player.name = name
+        player.state = i
+    if game_data_size:
+        msg.room.gameData = rng.randbytes(game_data_size)
+        for i in range(total):
+            player_data = msg.room.playersData.add()
+            player_data.time = i
+            player_data.data = rng.randbytes(max(1, game_data_size // max(1, total)))
+    return msg.SerializeToString()
+
+
+def build_event_frame() -> bytes:
+    msg = ws_pb2.WsData()
+    msg.event.key = 1
+    msg.event.data = b"ping"
+    return msg.SerializeToString()
+
+
+class FakeHullqin:
+    def __init__(
+        self,
+        games: int = 100,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        chunk_padding: int = 1024 * 1024,
+        game_data_size: int = 0,
+        seed: int = 0,
+    ) -> None:
+        self.games: Dict[str, str] = {f"g{i:03d}": f"测试游戏{i}" for i in range(games)}
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.chunk_padding = chunk_padding
+        self.game_data_size = game_data_size
+        self.random = random.Random(seed)
+        self.build = hashlib.sha1(f"{games}-{chunk_padding}".encode()).hexdigest()[:8]
+        self.room_overrides: Dict[str, List[str]] = {}
+        self.requests: Dict[str, int] = {"home": 0, "app": 0, "index": 0, "ws": 0}
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+        self.app = web.Application()
+        self.app.router.add_get("/", self.home)
+        self.app.router.add_get("/static/js/app.{build}.chunk.js", self.app_chunk)
+        self.app.router.add_get("/static/js/index.{build}.chunk.js", self.index_chunk)
+        self.app.router.add_get("/{game_id}/{room_id}", self.room)
+
+    @property
+    def ws_url(self) -> str:
+        return self.base_url.replace("http://", "ws://", 1)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{bound_port}/"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _inject(self) -> bool:
+        """按配置注入延迟，返回本次请求是否应失败"""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.random.random() < self.failure_rate
+
+    def _app_js(self) -> bytes:
+        entries = ",".join(f'{game_id}:"{name}"' for game_id, name in self.games.items())
+        padding = "a" * (self.chunk_padding // 2)
+        return f'{padding};var t=1,r={{{entries},p:"派对"}},o=function(){{}};{padding}'.encode()
+
+    def _index_js(self) -> bytes:
+        entries = ",".join(
+            f'{{gameKey:"{game_id}",rule:"".concat(z,"rule_{game_id}")}}' for game_id in self.games
+        )
+        padding = "b" * (self.chunk_padding // 2)
+        return f"{padding};var z=\"x\",c=[{entries}];{padding}".encode()
+
+    async def home(self, request: web.Request) -> web.StreamResponse:
+        self.requests["home"] += 1
+        if await self._inject():
+            return web.Response(status=503)
+        etag = f'"{self.build}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        body = (
+            "<!doctype html><html><head>"
+            f'<script src="{self.base_url}static/js/app.{self.build}.chunk.js"></script>'
+            f'<script src="{self.base_url}static/js/index.{self.build}.chunk.js"></script>'
+            "</head></html>"
+        )
+        return web.Response(text=body, content_type="text/html", headers={"ETag": etag})
+
+    async def app_chunk(self, request: web.Request) -> web.StreamResponse:
+        self.requests["app"] += 1
+        if await self._inject():
+            return web.Response(status=503)
+        return web.Response(body=self._app_js(), content_type="application/javascript")
+
+    async def index_chunk(self, request: web.Request) -> web.StreamResponse:
+        self.requests["index"] += 1
+        if await self._inject():
+            return web.Response(status=503)
+        return web.Response(body=self._index_js(), content_type="application/javascript")
+
+    def players_of(self, room_id: str) -> List[str]:
+        """房间内的玩家，未指定时按房间号确定性生成"""
+        if room_id in self.room_overrides:
+            return self.room_overrides[room_id]
+        seed = int(hashlib.md5(room_id.encode()).hexdigest(), 16)
+        total = 2 + seed % 7
+        current = seed % (total + 1)
+        return [f"玩家{i}" if i < current else "" for i in range(total)]
+
+    async def room(self, request: web.Request) -> web.StreamResponse:
+        self.requests["ws"] += 1
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        if await self._inject():
+            await ws.close(code=WSCloseCode.INTERNAL_ERROR)
+            return ws
+
+        room_id = request.match_info["room_id"]
+        players = self.players_of(room_id)
+        await ws.send_bytes(build_room_frame(room_id, len(players), players, self.game_data_size, self.random))
+        # 保持连接直到客户端关闭，模拟真实房间
+        async for _ in ws:
+            pass
+        return ws
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = FakeHullqin(
+        games=args.games,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        chunk_padding=args.chunk_padding,
+        game_data_size=args.game_data_size,
+    )
+    base_url = await server.start(args.host, args.port)
+    print(f"hullqin 替身服务已启动: {base_url}（websocket: {server.ws_url}）")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地 hullqin 替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--games", type=int, default=100, help="游戏数量")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求注入的延迟，单位：秒")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="请求失败的概率")
+    parser.add_argument("--chunk-padding", type=int, default=1024 * 1024, help="chunk 中填充的字节数")
+    parser.add_argument("--game-data-size", type=int, default=0, help="房间帧中 gameData 的字节数")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
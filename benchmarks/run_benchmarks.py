@@ -0,0 +1,255 @@
+"""
+组件性能测试，全部请求都发往本地 hullqin 替身服务（fake_hullqin.py），不依赖外网。
+
+覆盖：游戏列表抓取与解析、_decode_room、N 个房间的并发探测、M 个群的 DataManager 操作。
+
+    python benchmarks/run_benchmarks.py --json bench_output.json
+    python benchmarks/run_benchmarks.py --compare bench_output.json
+
+--json 保存本次结果，--compare 与之前保存的结果逐项对比，便于在版本之间比较。
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fake_hullqin import FakeHullqin, build_room_frame  # noqa: E402
+
+Result = Dict[str, float]
+
+
+def summarize(samples: List[float], ops: int = 1) -> Result:
+    """将若干次耗时（秒）汇总为毫秒统计，ops 为每次测量包含的操作数"""
+    ordered = sorted(sample * 1000 / ops for sample in samples)
+    return {
+        "runs": len(ordered),
+        "min_ms": ordered[0],
+        "median_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "mean_ms": statistics.fmean(ordered),
+    }
+
+
+async def measure(
+    run: Callable[[], Awaitable[None]],
+    repeat: int,
+    setup: Optional[Callable[[], Awaitable[None]]] = None,
+    ops: int = 1,
+) -> Result:
+    samples: List[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            await setup()
+        started = time.perf_counter()
+        await run()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples, ops)
+
+
+def init_plugin(server: FakeHullqin, data_dir: Path, storage_backend: str) -> None:
+    """初始化 nonebot 并加载插件，所有地址指向替身服务"""
+    import nonebot
+
+    nonebot.init(
+        driver="~none",
+        hullqin_home_url=server.base_url,
+        hullqin_ws_url=server.ws_url,
+        localstore_config_dir=str(data_dir),
+        storage_backend=storage_backend,
+        room_status_cache_ttl=0,
+        room_pool_size=0,
+        # 出站限流会把并发探测压到每秒 outbound_rate 次，测的就不再是插件本身的开销
+        outbound_rate=0,
+    )
+    nonebot.load_plugin("nonebot_plugin_hullqin_game")
+
+
+async def bench_catalog(results: Dict[str, Result], repeat: int) -> None:
+    from nonebot_plugin_hullqin_game.utils.game_scraper import game_scraper
+
+    async def _reset() -> None:
+        game_scraper._frontend_maps = None
+
+    async def _full() -> None:
+        await game_scraper.get_games_data()
+
+    results["catalog.full_scrape"] = await measure(_full, repeat, setup=_reset)
+
+    previous = await game_scraper.get_games_data()
+
+    async def _conditional() -> None:
+        await game_scraper.get_games_data(previous)
+
+    results["catalog.conditional_refresh"] = await measure(_conditional, repeat)
+
+
+async def bench_decode(results: Dict[str, Result], repeat: int) -> None:
+    from nonebot_plugin_hullqin_game.utils.room_frame import decode_room_players
+    from nonebot_plugin_hullqin_game.utils.room_ws_fetcher import _decode_room_full, _summarize_room
+
+    def _decode_fast(frame: bytes) -> None:
+        _summarize_room(decode_room_players(frame))
+
+    frames = {
+        "small_frame": build_room_frame("zmqq", 8, ["玩家A", "", "玩家C"]),
+        "large_frame": build_room_frame("zmqq", 8, ["玩家A", "", "玩家C"], game_data_size=64 * 1024),
+    }
+    decoders = {"fast": _decode_fast, "protobuf": _decode_room_full}
+    loops = 1000
+    for frame_name, frame in frames.items():
+        for decoder_name, decode in decoders.items():
+
+            async def _decode(frame: bytes = frame, decode: Callable[[bytes], None] = decode) -> None:
+                for _ in range(loops):
+                    decode(frame)
+
+            results[f"decode.{decoder_name}.{frame_name}"] = await measure(_decode, repeat, ops=loops)
+
+
+async def bench_probe(results: Dict[str, Result], repeat: int, room_counts: List[int]) -> None:
+    from nonebot_plugin_hullqin_game.utils.game_scraper import game_scraper
+
+    for count in room_counts:
+        rooms = [("g000", f"r{i:03d}") for i in range(count)]
+
+        async def _clear() -> None:
+            game_scraper._room_cache.clear()
+
+        async def _probe(rooms: List = rooms) -> None:
+            await game_scraper.get_rooms_data(rooms)
+
+        results[f"probe.rooms_{count}"] = await measure(_probe, repeat, setup=_clear)
+
+
+async def bench_data_manager(
+    results: Dict[str, Result],
+    repeat: int,
+    group_counts: List[int],
+    data_dir: Path,
+) -> None:
+    from nonebot_plugin_hullqin_game.utils.data_manager import data_manager
+    from nonebot_plugin_hullqin_game.utils.room_record import Room
+    from nonebot_plugin_hullqin_game.utils.storage import create_storage
+
+    original_storage = data_manager._storage
+    rooms_per_group = 3
+    try:
+        for count in group_counts:
+            group_ids = [100000 + i for i in range(count)]
+            samples: Dict[str, List[float]] = {"add": [], "exists": [], "expire": [], "flush": []}
+            for run in range(repeat):
+                data_manager._storage = create_storage(Path(tempfile.mkdtemp(dir=data_dir, prefix=f"dm{count}_{run}_")))
+                now = int(time.time())
+
+                started = time.perf_counter()
+                for group_id in group_ids:
+                    for i in range(rooms_per_group):
+                        data_manager.storage.add_room(
+                            str(group_id), Room("g000", f"r{i:03d}", now - 1 if i == 0 else now + 1200)
+                        )
+                samples["add"].append(time.perf_counter() - started)
+                # 与运行时一致：预热登记已有房间后，命令不再顺带清理本群
+                await data_manager.schedule_stored_rooms()
+
+                started = time.perf_counter()
+                for group_id in group_ids:
+                    await data_manager.check_game_exists(group_id, "g000", "r001")
+                samples["exists"].append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                for group_id in group_ids:
+                    await data_manager.remove_expired_games(group_id)
+                samples["expire"].append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                await data_manager.storage.flush_async()
+                samples["flush"].append(time.perf_counter() - started)
+                data_manager.storage.close()
+
+            for op, op_samples in samples.items():
+                results[f"data_manager.{op}.groups_{count}"] = summarize(op_samples)
+    finally:
+        data_manager._storage = original_storage
+
+
+def print_results(results: Dict[str, Result], baseline: Optional[Dict[str, Result]]) -> None:
+    header = f"{'benchmark':<40}{'median_ms':>12}{'p95_ms':>12}{'min_ms':>12}"
+    if baseline:
+        header += f"{'baseline':>12}{'change':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        line = f"{name:<40}{result['median_ms']:>12.3f}{result['p95_ms']:>12.3f}{result['min_ms']:>12.3f}"
+        if baseline and name in baseline:
+            old = baseline[name]["median_ms"]
+            change = (result["median_ms"] - old) / old * 100 if old else 0.0
+            line += f"{old:>12.3f}{change:>+9.1f}%"
+        print(line)
+
+
+async def main(args: argparse.Namespace) -> None:
+    server = FakeHullqin(
+        games=args.games,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        chunk_padding=args.chunk_padding,
+    )
+    await server.start()
+    data_dir = Path(tempfile.mkdtemp(prefix="hullqin_bench_"))
+    init_plugin(server, data_dir, args.storage)
+
+    from nonebot_plugin_hullqin_game.utils.game_scraper import game_scraper
+
+    results: Dict[str, Result] = {}
+    try:
+        await bench_catalog(results, args.repeat)
+        await bench_decode(results, args.repeat)
+        await bench_probe(results, args.repeat, [int(n) for n in args.rooms.split(",")])
+        await bench_data_manager(results, args.repeat, [int(n) for n in args.groups.split(",")], data_dir)
+    finally:
+        await game_scraper.close()
+        await server.stop()
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))["results"]
+    print_results(results, baseline)
+
+    if args.json:
+        output = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "storage": args.storage,
+                "games": args.games,
+                "latency": args.latency,
+                "failure_rate": args.failure_rate,
+                "repeat": args.repeat,
+            },
+            "results": results,
+        }
+        Path(args.json).write_text(json.dumps(output, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="hullqin 插件组件性能测试")
+    parser.add_argument("--repeat", type=int, default=5, help="每项测试的重复次数")
+    parser.add_argument("--games", type=int, default=100, help="替身服务中的游戏数量")
+    parser.add_argument("--latency", type=float, default=0.0, help="替身服务注入的延迟，单位：秒")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="替身服务注入的失败概率")
+    parser.add_argument("--chunk-padding", type=int, default=1024 * 1024, help="chunk 中填充的字节数")
+    parser.add_argument("--rooms", default="1,10,50", help="房间探测测试的房间数，逗号分隔")
+    parser.add_argument("--groups", default="10,100,1000", help="DataManager 测试的群数量，逗号分隔")
+    parser.add_argument("--storage", choices=["json", "sqlite"], default="json", help="DataManager 存储后端")
+    parser.add_argument("--json", help="将结果保存为 JSON")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果对比")
+    asyncio.run(main(parser.parse_args()))
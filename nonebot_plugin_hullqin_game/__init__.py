@@ -1,3 +1,7 @@
+import time
+
+_load_started = time.perf_counter()
+
 from nonebot.plugin import PluginMetadata
 from .config import Config, config
 
@@ -6,9 +10,11 @@ __plugin_meta__ = PluginMetadata(
     description="Hullqin Game 桌游发车",
     usage="""▶ 发车 <游戏名称> [房间ID]：发起新的桌游
   ▷ 不填游戏名称会显示游戏列表
+▶ 发车 <游戏名称> <数量>：一次发起多个房间
 ▶ 查车：查看本群的桌游
-▶ 封车 <序号>：关闭指定的桌游房间
+▶ 封车 <序号> [序号...]：按查车的序号关闭房间，可一次关闭多个
 ▶ 封车 <游戏名称> <房间ID>：关闭指定的桌游房间
+▶ 桌游状态：查看插件运行指标（仅超级用户）
 """,
     type="application",
     homepage="https://github.com/GLDYM/nonebot-plugin-hullqin-game",
@@ -21,18 +27,110 @@ from nonebot import require
 
 require("nonebot_plugin_localstore")
 
-from typing import Union
-from nonebot import on_command
+import asyncio
+import inspect
+from typing import Awaitable, Callable, List, Optional, Union
+from nonebot import on_command, get_driver, logger
 from nonebot.adapters.onebot.v11 import (
     GroupMessageEvent,
     PrivateMessageEvent,
 )
+from nonebot.consts import CMD_KEY, PREFIX_KEY
+from nonebot.matcher import Matcher
+from nonebot.message import run_postprocessor, run_preprocessor
+from nonebot.typing import T_State
 
 from .commands import (
+    bot_status,
     open_games,
     query_games,
     stop_games,
 )
+from .utils.data_manager import data_manager
+from .utils.game_scraper import game_scraper
+from .utils.metrics import metrics
+from .utils.room_ws_fetcher import warm_decoder
+
+driver = get_driver()
+STARTED_KEY = "_hullqin_started"
+_prewarm_task: Optional[asyncio.Task] = None
+_first_command_logged = False
+
+
+async def _timed(name: str, timings: List[str], step: Callable[[], Union[None, Awaitable[None]]]):
+    started = time.perf_counter()
+    try:
+        result = step()
+        if inspect.isawaitable(result):
+            await result
+    except Exception as e:
+        logger.warning(f"预热 {name} 失败，将在首次使用时重试: {e!r}")
+        timings.append(f"{name} 失败")
+        return
+    timings.append(f"{name} {(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+async def _prewarm():
+    """后台预热：连接池、房间数据、解码器与游戏列表索引，任何一步失败都不影响机器人运行"""
+    started = time.perf_counter()
+    timings: List[str] = []
+    await _timed("连接池", timings, game_scraper.get_session)
+    await _timed("房间数据", timings, data_manager.schedule_stored_rooms)
+    if config.room_watcher_enabled:
+        await _timed(
+            "房间监听",
+            timings,
+            lambda: game_scraper.room_watcher.start(data_manager.rooms_by_key, data_manager.game_name_of),
+        )
+    await _timed("解码器", timings, warm_decoder)
+    # 没有游戏列表时在这里完成抓取，首次发车无需等待；列表过期时只在后台刷新
+    await _timed("游戏列表", timings, data_manager.get_games_list)
+    logger.info(f"预热完成，用时 {(time.perf_counter() - started) * 1000:.0f}ms（{'，'.join(timings)}）")
+
+
+@driver.on_startup
+async def _():
+    global _prewarm_task
+    await metrics.start_export()
+    # 后台清理不依赖预热，预热失败时新加入的房间仍会按时清理
+    data_manager.start_expiry()
+    _prewarm_task = asyncio.create_task(_prewarm())
+
+
+@driver.on_shutdown
+async def _():
+    if _prewarm_task is not None and not _prewarm_task.done():
+        _prewarm_task.cancel()
+        await asyncio.gather(_prewarm_task, return_exceptions=True)
+    await data_manager.stop_expiry()
+    # 房间池补充、实时监听与探测会查询和更新房间数据，先停止它们，再做最后一次写回并关闭存储
+    await game_scraper.close()
+    await data_manager.close()
+    await metrics.stop_export()
+
+
+# 其他插件的事件只多一次模块名比较；命令耗时仅在开启指标时记录
+@run_preprocessor
+async def _(matcher: Matcher, state: T_State):
+    if matcher.module_name and matcher.module_name.startswith(__name__):
+        state[STARTED_KEY] = time.perf_counter()
+
+
+@run_postprocessor
+async def _(matcher: Matcher, exception: Optional[Exception], state: T_State):
+    global _first_command_logged
+    started = state.get(STARTED_KEY)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    command = ((state.get(PREFIX_KEY) or {}).get(CMD_KEY) or ("unknown",))[0]
+    metrics.observe("hullqin_command_seconds", elapsed, command=command)
+    if exception is not None:
+        metrics.inc("hullqin_command_errors_total", command=command)
+    if not _first_command_logged:
+        _first_command_logged = True
+        logger.info(f"启动后首个命令 {command} 用时 {elapsed * 1000:.1f}ms")
+
 
 help_cmd = on_command(
     "game_help",
@@ -45,3 +143,6 @@ help_cmd = on_command(
 @help_cmd.handle()
 async def _(event: Union[GroupMessageEvent, PrivateMessageEvent]):
     await help_cmd.finish(__plugin_meta__.usage)
+
+
+logger.info(f"插件加载用时 {(time.perf_counter() - _load_started) * 1000:.1f}ms")
@@ -0,0 +1,28 @@
+import time
+
+from nonebot import on_command
+from nonebot.permission import SUPERUSER
+
+from ..utils.circuit_breaker import hullqin_circuit
+from ..utils.data_manager import data_manager
+from ..utils.metrics import metrics
+from ..utils.rate_limiter import outbound_limiter
+
+bot_status = on_command(
+    "hullqin_status", aliases={"桌游状态"}, permission=SUPERUSER, priority=5, block=True
+)
+
+
+@bot_status.handle()
+async def _():
+    uptime = int(time.time() - metrics.started_at)
+    lines = [f"==== 桌游状态 ====\n已运行 {uptime // 3600}小时{uptime % 3600 // 60}分"]
+    games_data = await data_manager.load_games_data()
+    lines.append(f"游戏列表：{games_data.get('version', '未知版本')}，共 {len(games_data.get('games', []))} 个游戏")
+    lines.append(hullqin_circuit.describe())
+    lines.extend(outbound_limiter.describe())
+    if metrics.enabled:
+        lines.extend(metrics.summary() or ["暂无数据"])
+    else:
+        lines.append("未开启指标记录，请在配置中设置 metrics_enabled=true")
+    await bot_status.finish("\n".join(lines))
@@ -13,8 +13,10 @@ from nonebot.adapters.onebot.v11 import (
     MessageSegment,
 )
 
+from ..config import config
 from ..utils.data_manager import data_manager
 from ..utils.game_scraper import game_scraper
+from ..utils.room_record import Room
 
 
 open_games = on_command(
@@ -33,7 +35,6 @@ async def _(bot: Bot, event: GroupMessageEvent, arg: Message = CommandArg()):
     logger.info(f"{group_id} 发车参数: {args}")
 
     games_list = await data_manager.get_games_list()
-    data_manager.remove_expired_games(group_id)
 
     if not args or args == []:
         message_lines = ["==== 游戏列表 ===="]
@@ -44,19 +45,25 @@ async def _(bot: Bot, event: GroupMessageEvent, arg: Message = CommandArg()):
         await forward_send(bot, event, [MessageSegment.text("\n".join(message_lines))])
         return None
 
+    count = 1
     match len(args):
         case 1:
             game_name = args[0]
             room_id = None
         case 2:
             game_name, room_id = args
-            if not bool(re.match(r"^[a-z0-9]{4}$", room_id)):
+            # 4 位的按房间ID处理，其余纯数字为批量发车的房间数
+            if re.match(r"^[a-z0-9]{4}$", room_id):
+                pass
+            elif room_id.isdigit():
+                count = int(room_id)
+                room_id = None
+                if not 1 <= count <= config.room_batch_max:
+                    await open_games.send(f"一次最多开 {config.room_batch_max} 个房间")
+                    return None
+            else:
                 await open_games.send("房间ID格式错误，应为4位小写字母或数字组合。")
                 return None
-            if data_manager.check_game_exists(group_id, game_name, room_id):
-                await open_games.send("这个房间在这个群有了！请输入 查房 查看房间列表")
-                return None
-            await open_games.send("⚠️你指定了房间ID，不保证房间一定未占用")
         case _:
             await open_games.send("参数错误，请使用：发车 [游戏名称]")
             return None
@@ -64,34 +71,55 @@ async def _(bot: Bot, event: GroupMessageEvent, arg: Message = CommandArg()):
     game = data_manager.search_game(game_name)
 
     if game is None:
-        await open_games.send("未找到该游戏，请输入 发车 查看可用游戏。")
+        suggestions = data_manager.suggest_games(game_name)
+        if suggestions:
+            candidates = "\n".join(
+                f"{candidate['game_name']}（游戏ID: {candidate['game_id']}）" for candidate in suggestions
+            )
+            await open_games.send(f"未找到该游戏，你是不是想找：\n{candidates}")
+        else:
+            await open_games.send("未找到该游戏，请输入 发车 查看可用游戏。")
         return None
 
-    game_name = game.get("game_name")
     game_id = game.get("game_id")
     rule_link = game.get("rule_link", "无")
 
-    game_data = await game_scraper.get_game_data(game_id, room_id)
-
-    expired_time = game_data.get("expired_time")
-    room_id = game_data["room_id"]
+    # 检查与加入需在同一把群组锁内完成，避免并发发车重复占用同一房间
+    async with data_manager.group_lock(group_id):
+        if room_id is not None:
+            if await data_manager.check_game_exists(group_id, game_id, room_id):
+                await open_games.send("这个房间在这个群有了！请输入 查房 查看房间列表")
+                return None
+            await open_games.send("⚠️你指定了房间ID，不保证房间一定未占用")
 
-    data_manager.add_game_to_group(
-        group_id,
-        {
-            "expired_time": expired_time,
-            "game_name": game_name,
-            "game_id": game_id,
-            "room_id": room_id,
-            "rule_link": rule_link,
-        },
-    )
-    message = await create_game_message(
-        game["game_name"],
-        game["game_id"],
-        room_id,
-        rule_link,
-    )
+        if count > 1:
+            # 整批分配房间号后一次写入
+            rooms = [
+                Room(game_id, game_data["room_id"], game_data["expired_time"])
+                for game_data in await game_scraper.get_game_data_batch(game_id, count)
+            ]
+            await data_manager.add_games_to_group(group_id, rooms)
+        else:
+            game_data = await game_scraper.get_game_data(game_id, room_id)
+
+            expired_time = game_data.get("expired_time")
+            room_id = game_data["room_id"]
+
+            await data_manager.add_game_to_group(group_id, Room(game_id, room_id, expired_time))
+    if count > 1:
+        message = await create_games_message(
+            game["game_name"],
+            game["game_id"],
+            [room.room_id for room in rooms],
+            rule_link,
+        )
+    else:
+        message = await create_game_message(
+            game["game_name"],
+            game["game_id"],
+            room_id,
+            rule_link,
+        )
 
     await open_games.send(message)
     return None
@@ -112,6 +140,24 @@ async def create_game_message(
     return MessageSegment.text(message)
 
 
+async def create_games_message(
+    game_name: str,
+    game_id: str,
+    room_ids: List[str],
+    rule_link: str,
+) -> MessageSegment:
+    game_links = "\n".join(
+        f"{index}. https://game.hullqin.cn/{game_id}/{room_id}" for index, room_id in enumerate(room_ids, 1)
+    )
+    message = (
+        f"🎉 桌游发车成功！共 {len(room_ids)} 个房间 🎉\n\n"
+        f"游戏名称：{game_name}\n"
+        f"房间链接：\n{game_links}\n"
+        f"规则链接：{rule_link}"
+    )
+    return MessageSegment.text(message)
+
+
 async def forward_send(
     bot: Bot,
     event: Union[GroupMessageEvent, PrivateMessageEvent],
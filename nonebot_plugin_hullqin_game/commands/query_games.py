@@ -1,5 +1,6 @@
+import asyncio
 import shlex
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Set, Union
 
 from nonebot import on_command
 from nonebot.adapters import Message
@@ -11,8 +12,11 @@ from nonebot.adapters.onebot.v11 import (
     MessageSegment,
 )
 
+from ..config import config
+from ..utils.circuit_breaker import hullqin_circuit
 from ..utils.data_manager import data_manager
 from ..utils.game_scraper import game_scraper
+from ..utils.room_record import Room
 
 query_games = on_command(
     "query_games", aliases={"查车", "查房", "房间列表"}, priority=5, block=True
@@ -24,22 +28,28 @@ async def _(bot: Bot, event: GroupMessageEvent, arg: Message = CommandArg()):
     group_id = event.group_id
     args = shlex.split(arg.extract_plain_text())
 
-    group_data = data_manager.load_group_data(group_id)
+    group_data = await data_manager.load_group_data(group_id)
+    # 展示与搜索游戏都需要游戏列表，预热通常已加载
+    await data_manager.load_games_data()
     if "games" not in group_data or not group_data["games"]:
         await query_games.send("当前没有任何桌游房间哦~")
         return None
 
-    data_manager.remove_expired_games(group_id)
-
-    if not group_data["games"]:
-        await query_games.send("当前没有任何桌游房间哦~")
-        return None
-
     if args and len(args) == 1:
         game_name = args[0]
         game_data = data_manager.search_game(game_name)
+        if game_data is None:
+            suggestions = data_manager.suggest_games(game_name)
+            if suggestions:
+                candidates = "\n".join(
+                    f"{candidate['game_name']}（游戏ID: {candidate['game_id']}）" for candidate in suggestions
+                )
+                await query_games.send(f"未找到游戏 {game_name}，你是不是想找：\n{candidates}")
+            else:
+                await query_games.send(f"未找到游戏 {game_name}，请输入 发车 查看可用游戏。")
+            return None
         filtered_games = [
-            game for game in group_data["games"] if game["game_id"] == game_data["game_id"]
+            room for room in group_data["games"] if room.game_id == game_data["game_id"]
         ]
         if not filtered_games or filtered_games == []:
             await query_games.send(f"当前没有找到 {game_name} 的房间哦~")
@@ -48,35 +58,26 @@ async def _(bot: Bot, event: GroupMessageEvent, arg: Message = CommandArg()):
     else:
         room_list = group_data["games"]
 
-    i = 0
-    message_lines = ["==== 房间列表 ===="]
-    for game in room_list:
-        game_name = game.get("game_name")
-        game_id = game.get("game_id")
-        room_id = game.get("room_id")
-        rule = game.get("rule_link", "无")
-        url = f"https://game.hullqin.cn/{game_id}/{room_id}"
-        
-
-        current = await game_scraper.get_room_data(game_id, room_id)
-        if current:
-            current_players = current["current"]
-            total_players = current["total"]
-            players = current["players"]
-            player_list = "，".join(players)
-            message_lines.append(
-                f"{i}. {game_name}（{current_players}/{total_players}）：{url}\n> 规则链接: {rule}\n> 玩家列表: {player_list}"
-            )
-        else:
-            message_lines.append(
-                f"{i}. {game_name}：{url}\n> 规则链接: {rule}"
-            )
-
-        # message_lines.append(
-        #     f"{i}. {game_name}：{url}\n> 规则链接: {rule}"
-        # )
-        i += 1
+    data_manager.remember_listing(group_id, room_list)
+    await send_rooms_progressively(bot, event, room_list)
+
+
+def render_room(index: int, room: Room, current: Optional[Dict[str, any]]) -> str:
+    # 名称与规则链接不随房间保存，展示时从游戏列表中查找
+    game_name = data_manager.game_name_of(room.game_id)
+    rule = data_manager.rule_link_of(room.game_id)
+    url = f"https://game.hullqin.cn/{room.game_id}/{room.room_id}"
+
+    if current:
+        player_list = "，".join(current["players"])
+        return (
+            f"{index}. {game_name}（{current['current']}/{current['total']}）：{url}\n"
+            f"> 规则链接: {rule}\n> 玩家列表: {player_list}"
+        )
+    return f"{index}. {game_name}：{url}\n> 规则链接: {rule}"
+
 
+async def send_lines(bot: Bot, event: GroupMessageEvent, message_lines: List[str]) -> None:
     if len(message_lines) <= 5:
         await query_games.send("\n".join(message_lines))
     else:
@@ -87,6 +88,63 @@ async def _(bot: Bot, event: GroupMessageEvent, arg: Message = CommandArg()):
         )
 
 
+async def send_rooms_progressively(bot: Bot, event: GroupMessageEvent, room_list: List[Room]) -> None:
+    """
+    先发送已有结果（缓存、实时监听或很快完成的探测），其余房间探测完成后分批追加。
+
+    序号始终是房间在本次列表中的位置，与 封车 <序号> 一致；超过总时限仍未完成的房间不显示玩家信息。
+    """
+    # 查询期间可能有房间被关闭或过期，只按进入时的列表渲染，序号与玩家信息不会错位
+    room_list = list(room_list)
+    rooms = [room.key for room in room_list]
+    tasks = game_scraper.probe_rooms(rooms)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + config.query_deadline
+    pending: Set[asyncio.Task] = set(tasks)
+    sent: Set[int] = set()
+    replied = False
+    wait = config.query_first_wait
+
+    def _render(indices: List[int]) -> List[str]:
+        message_lines = ["==== 房间列表（续）====" if sent else "==== 房间列表 ===="]
+        for i in indices:
+            current = game_scraper.room_task_result(tasks[i], *rooms[i]) if tasks[i].done() else None
+            message_lines.append(render_room(i, room_list[i], current))
+        if hullqin_circuit.is_open:
+            message_lines.append("hullqin 暂时无法连接，部分房间未显示人数")
+        return message_lines
+
+    try:
+        while pending:
+            timeout = min(wait, deadline - loop.time())
+            if timeout <= 0:
+                break
+            _, pending = await asyncio.wait(pending, timeout=timeout)
+            wait = config.query_update_interval
+
+            ready = [i for i, task in enumerate(tasks) if i not in sent and task.done()]
+            if not ready:
+                if not replied:
+                    await query_games.send(f"正在查询 {len(tasks)} 个房间的人数，请稍候…")
+                    replied = True
+                continue
+
+            message_lines = _render(ready)
+            if pending:
+                message_lines.append(f"其余 {len(pending)} 个房间查询中…")
+            sent.update(ready)
+            replied = True
+            await send_lines(bot, event, message_lines)
+    finally:
+        for task in pending:
+            task.cancel()
+
+    # 超时的房间不再等待，直接列出
+    remaining = [i for i in range(len(tasks)) if i not in sent]
+    if remaining:
+        await send_lines(bot, event, _render(remaining))
+
+
 async def forward_send(
     bot: Bot,
     event: Union[GroupMessageEvent, PrivateMessageEvent],
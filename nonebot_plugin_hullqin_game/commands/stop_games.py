@@ -1,5 +1,6 @@
+import re
 import shlex
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
 
 from nonebot import on_command
 from nonebot.adapters import Message
@@ -21,42 +22,78 @@ async def _(bot: Bot, event: GroupMessageEvent, arg: Message = CommandArg()):
     group_id = event.group_id
     args = shlex.split(arg.extract_plain_text())
 
-    group_data = data_manager.load_group_data(group_id)
+    group_data = await data_manager.load_group_data(group_id)
     if "games" not in group_data or not group_data["games"]:
         await stop_games.send("当前没有任何桌游房间哦~")
         return None
-    
-    # 此处不应该清除过期房间，会导致索引号混乱 
-    # data_manager.remove_expired_games(group_id)
-    
+
     if not args or args == []:
         await stop_games.send("请提供要关闭的房间索引号，或游戏ID和房间ID")
         return None
-    if len(args) == 1:
-        try:
-            index = int(args[0])
-        except ValueError:
-            await stop_games.send("房间索引号应为整数")
-        if index < 0 or index >= len(group_data["games"]):
-            await stop_games.send("房间索引号超出范围，请使用 查车 查看有效的索引号")
-        data_manager.remove_game_by_index(group_id, index)
-        await stop_games.send(f"已关闭索引号为 {index} 的房间")
+    indexes = parse_indexes(args)
+    if indexes is not None:
+        # 所有序号按同一份查车展示顺序解析，前面的房间被关闭不会让后面的序号错位
+        resolved = await data_manager.resolve_listing_indexes(group_id, indexes)
+        keys = [key for key in resolved.values() if key is not None]
+        async with data_manager.group_lock(group_id):
+            removed = set(await data_manager.remove_games_from_group(group_id, keys)) if keys else set()
+        closed = [index for index in indexes if resolved[index] in removed]
+        gone = [index for index in indexes if resolved[index] is not None and resolved[index] not in removed]
+        out_of_range = [index for index in indexes if resolved[index] is None]
+        lines = []
+        if closed:
+            lines.append(f"已关闭索引号为 {join_indexes(closed)} 的房间")
+        if gone:
+            lines.append(f"索引号为 {join_indexes(gone)} 的房间已过期或已关闭")
+        if out_of_range:
+            lines.append(f"房间索引号 {join_indexes(out_of_range)} 超出范围，请使用 查车 查看有效的索引号")
+        await stop_games.send("\n".join(lines))
+    elif len(args) == 1:
+        await stop_games.send("房间索引号应为整数")
+        return None
     elif len(args) == 2:
         game_name = args[0]
         
+        await data_manager.load_games_data()
         game = data_manager.search_game(game_name)
         if not game:
-            await stop_games.send(f"未找到游戏名称为 {game_name} 的游戏，请检查名称是否正确")
+            suggestions = data_manager.suggest_games(game_name)
+            if suggestions:
+                candidates = "\n".join(
+                    f"{candidate['game_name']}（游戏ID: {candidate['game_id']}）" for candidate in suggestions
+                )
+                await stop_games.send(f"未找到游戏名称为 {game_name} 的游戏，你是不是想找：\n{candidates}")
+            else:
+                await stop_games.send(f"未找到游戏名称为 {game_name} 的游戏，请检查名称是否正确")
             return None
 
         game_id = game["game_id"]
         room_id = args[1]
-        if not data_manager.check_game_exists(group_id, game_id, room_id):
+        async with data_manager.group_lock(group_id):
+            exists = await data_manager.check_game_exists(group_id, game_id, room_id)
+            if exists:
+                await data_manager.remove_game_from_group(group_id, game_id, room_id)
+        if not exists:
             await stop_games.send("未找到指定的游戏房间，请检查游戏ID和房间ID是否正确")
-        data_manager.remove_game_from_group(group_id, game_id, room_id)
+            return None
         await stop_games.send(f"已关闭游戏ID为 {game_id}，房间ID为 {room_id} 的房间")
     else:
-        await stop_games.send("参数错误，请提供正确的游戏ID和房间ID")
+        await stop_games.send("参数错误，请提供房间索引号，或游戏ID和房间ID")
     
     return None
+
+
+def parse_indexes(args: List[str]) -> Optional[List[int]]:
+    """解析 封车 <序号...>，参数不全是整数时返回 None；两个参数且第二个形如房间ID时按 游戏 房间 处理"""
+    if len(args) == 2 and re.match(r"^[a-z0-9]{4}$", args[1]):
+        return None
+    try:
+        indexes = [int(arg) for arg in args]
+    except ValueError:
+        return None
+    return list(dict.fromkeys(indexes))
+
+
+def join_indexes(indexes: List[int]) -> str:
+    return "、".join(str(index) for index in indexes)
         
\ No newline at end of file
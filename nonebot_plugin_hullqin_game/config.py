@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel
 
 from nonebot import get_plugin_config
@@ -5,7 +7,59 @@ from nonebot import get_plugin_config
 # fmt:off
 class Config(BaseModel):
     room_expired_time: int = 1200  # 招募信息过期时间，单位：秒
+    room_extend_time: int = 1200  # 探测到房间有人时，至少保留到此时间之后，单位：秒，0 为不延长
+    room_empty_evict_after: int = 3  # 连续多少次观察到房间无人后提前移除，0 为不移除
+    room_empty_observe_interval: float = 300.0  # 两次无人观察之间的最小间隔，单位：秒
+    room_batch_max: int = 10  # 批量发车一次最多开的房间数
     playwright_headless: bool = True  # Playwright 是否无头模式
+    hullqin_home_url: str = "https://game.hullqin.cn/"  # 抓取游戏列表的首页地址
+    hullqin_ws_url: str = "wss://game.hullqin.cn/"  # 房间 websocket 地址前缀
+    room_probe_concurrency: int = 5  # 单次查车同时探测的房间数上限
+    room_probe_global_concurrency: int = 20  # 全局同时发往 hullqin 的请求数上限，即自适应并发窗口的上限
+    outbound_rate: float = 20.0  # 每秒最多发起的请求数，0 为不限
+    outbound_burst: float = 20.0  # 令牌桶容量，允许的瞬时突发请求数
+    outbound_min_concurrency: int = 2  # 自适应并发窗口的下限
+    outbound_latency_target: float = 3.0  # 房间探测平滑延迟超过此值时缩小并发窗口，单位：秒
+    outbound_error_threshold: float = 0.3  # 请求平滑错误率超过此值时缩小并发窗口
+    room_failure_backoff: float = 10.0  # 房间探测失败后暂停探测的初始时间，连续失败时翻倍，单位：秒，0 为不暂停
+    room_failure_max_backoff: float = 300.0  # 房间探测失败后暂停探测的最长时间，单位：秒
+    circuit_failure_threshold: int = 5  # 连续请求失败多少次后暂停访问 hullqin，0 为关闭熔断
+    circuit_open_seconds: float = 30.0  # 熔断后暂停访问的时间，之后放行一个试探请求，单位：秒
+    room_ws_connect_timeout: float = 5.0  # 房间 websocket 建立连接超时，单位：秒
+    room_ws_frame_timeout: float = 5.0  # 等待房间数据帧超时，单位：秒
+    room_ws_total_timeout: float = 10.0  # 单次房间探测总超时，单位：秒
+    room_frame_decoder: Literal["auto", "fast", "protobuf"] = "auto"  # 房间帧解码方式
+    query_first_wait: float = 1.5  # 查车首条回复最多等待探测结果的时间，单位：秒
+    query_update_interval: float = 2.0  # 之后每隔多久追加发送已查到的房间，单位：秒
+    query_deadline: float = 12.0  # 查车的总时限，超时的房间不显示玩家信息，单位：秒
+    room_status_cache_ttl: float = 15.0  # 房间状态缓存时间，单位：秒，0 为不缓存
+    room_status_cache_size: int = 512  # 房间状态缓存的最大条目数
+    room_registry_enabled: bool = False  # 多个进程共用数据目录时，通过登记表共享房间状态并避免重复探测
+    room_registry_lease: float = 10.0  # 探测租约时长，其他进程最多等待这么久，单位：秒
+    room_registry_poll_interval: float = 0.2  # 等待其他进程探测结果时的轮询间隔，单位：秒
+    http_pool_size: int = 20  # 共享 HTTP 连接池的最大连接数
+    http_dns_cache_ttl: int = 300  # DNS 缓存时间，单位：秒
+    http_keepalive_timeout: float = 30.0  # 空闲连接保活时间，单位：秒
+    data_flush_delay: float = 2.0  # 群组数据合并写回的延迟，单位：秒
+    storage_backend: Literal["json", "sqlite"] = "json"  # 数据存储后端
+    group_lock_stripes: int = 64  # 群组锁的分段数量
+    catalog_retry_interval: int = 600  # 游戏列表刷新失败后的重试间隔，单位：秒
+    room_listing_ttl: int = 600  # 封车 <序号> 沿用查车展示顺序的有效期，单位：秒
+    chunk_scan_window: int = 65536  # 流式解析前端 chunk 时每次读取的字节数
+    room_pool_size: int = 3  # 每个常用游戏预先确认空闲的房间号数量，0 为关闭
+    room_pool_games: int = 5  # 维护空闲房间池的常用游戏数量
+    room_pool_max_age: int = 120  # 空闲房间号的有效期，单位：秒
+    room_watcher_enabled: bool = False  # 是否为登记的房间保持长连接实时监听
+    room_watcher_notify: bool = True  # 监听到满员、清空时是否向群推送提醒
+    room_watcher_max_connections: int = 50  # 同时监听的房间数上限
+    room_watcher_idle_timeout: int = 600  # 房间持续无人多久后暂停监听，单位：秒
+    room_watcher_sync_interval: float = 30.0  # 同步监听房间列表的间隔，单位：秒
+    room_watcher_max_backoff: float = 300.0  # 断线重连的最大退避时间，单位：秒
+    metrics_enabled: bool = False  # 是否记录内置指标
+    metrics_host: str = "127.0.0.1"  # 指标服务监听地址
+    metrics_port: int = 0  # 指标服务端口，提供 Prometheus 格式的 /metrics，0 为不启动
+    metrics_file: str = ""  # 定期写入 Prometheus 格式指标的文件路径，为空不写入
+    metrics_write_interval: float = 60.0  # 写入指标文件的间隔，单位：秒
 # fmt:on
 
 config = get_plugin_config(Config)
\ No newline at end of file
@@ -0,0 +1,88 @@
+import hashlib
+import json
+from typing import Dict, List, Optional, Set, Tuple
+
+
+def normalize(text: str) -> str:
+    """统一大小写并去掉空白，用于游戏名与游戏ID的匹配"""
+    return "".join(text.split()).casefold()
+
+
+def ngrams(text: str, n: int = 2) -> Set[str]:
+    """带首尾标记的 n-gram，短文本也能参与匹配"""
+    padded = f"^{text}$"
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class CatalogIndex:
+    """游戏列表索引，支持按ID/名称精确查找与前缀、子串、n-gram 模糊查找"""
+
+    PREFIX_SCORE = 1.0
+    SUBSTRING_SCORE = 0.8
+    FUZZY_WEIGHT = 0.7
+    MIN_FUZZY_SCORE = 0.2
+
+    def __init__(self, games: List[Dict[str, str]]) -> None:
+        self.version = self.version_of(games)
+        self.games = games
+        self._exact: Dict[str, Dict[str, str]] = {}
+        self._keys: List[Tuple[str, str]] = []
+        self._key_grams: List[Tuple[Set[str], Set[str]]] = []
+        self._grams: Dict[str, Set[int]] = {}
+
+        for position, game in enumerate(games):
+            game_id = normalize(game["game_id"])
+            game_name = normalize(game["game_name"])
+            # 游戏ID优先于同名的游戏名称
+            self._exact.setdefault(game_name, game)
+            self._exact[game_id] = game
+            id_grams = ngrams(game_id)
+            name_grams = ngrams(game_name)
+            self._keys.append((game_id, game_name))
+            self._key_grams.append((id_grams, name_grams))
+            for gram in id_grams | name_grams:
+                self._grams.setdefault(gram, set()).add(position)
+
+    @staticmethod
+    def version_of(games: List[Dict[str, str]]) -> str:
+        """根据游戏列表内容计算版本号，内容不变则版本不变"""
+        raw = json.dumps(games, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, keyword: str) -> Optional[Dict[str, str]]:
+        """按游戏ID或名称精确查找，忽略大小写与空白"""
+        return self._exact.get(normalize(keyword))
+
+    def search(self, keyword: str, limit: int = 5) -> List[Tuple[float, Dict[str, str]]]:
+        """模糊查找，返回按得分从高到低排列的 (得分, 游戏)"""
+        query = normalize(keyword)
+        if not query:
+            return []
+        query_grams = ngrams(query)
+
+        candidates: Set[int] = set()
+        for gram in query_grams:
+            candidates.update(self._grams.get(gram, ()))
+
+        scored: List[Tuple[float, int]] = []
+        for position in candidates:
+            score = max(
+                self._score(query, query_grams, key, key_grams)
+                for key, key_grams in zip(self._keys[position], self._key_grams[position])
+            )
+            if score >= self.MIN_FUZZY_SCORE:
+                scored.append((score, position))
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(score, self.games[position]) for score, position in scored[:limit]]
+
+    def _score(self, query: str, query_grams: Set[str], key: str, key_grams: Set[str]) -> float:
+        if key.startswith(query):
+            return self.PREFIX_SCORE
+        if query in key:
+            return self.SUBSTRING_SCORE
+        # Dice 系数，用于容忍错别字；加权后始终低于子串匹配，不会被当作唯一匹配直接采用
+        dice = 2 * len(query_grams & key_grams) / (len(query_grams) + len(key_grams))
+        return dice * self.FUZZY_WEIGHT
@@ -0,0 +1,99 @@
+"""
+随插件发布的游戏列表快照。
+
+catalog_snapshot.json 由 scripts/update_catalog_snapshot.py 从 hullqin 抓取生成，发布流程在打包前自动更新。
+全新安装或游戏列表文件缺失、损坏时直接使用快照，首次发车无需联网；之后的联网刷新在已有列表的基础上
+应用增量（新增、移除的游戏以及变化的名称、规则链接），并在游戏列表的 version 中记录当前生效的版本：
+    snapshot-<快照版本>  仍在使用内置快照
+    hullqin-<chunk 哈希>  已按 hullqin 前端的某个版本更新
+"""
+import json
+import re
+import time
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from nonebot import logger
+
+SNAPSHOT_PATH = Path(__file__).resolve().parent.parent / "catalog_snapshot.json"
+
+GamesData = Dict[str, Union[int, str, List[Dict[str, str]], Dict[str, str]]]
+
+
+def load_snapshot() -> Optional[GamesData]:
+    """读取内置快照，没有快照或快照为空时返回 None；返回的列表已过期，使用时会在后台联网刷新"""
+    try:
+        snapshot = json.loads(SNAPSHOT_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        logger.warning(f"读取内置游戏列表快照失败: {e!r}")
+        return None
+    if not snapshot.get("games"):
+        return None
+    return {
+        "expired_time": 0,
+        "games": snapshot["games"],
+        "source": snapshot.get("source") or {},
+        "version": f"snapshot-{snapshot.get('version', 'unknown')}",
+    }
+
+
+def source_version(source: Dict[str, str]) -> str:
+    """由前端 chunk 地址得到版本号，chunk 文件名中带有构建哈希"""
+    match = re.search(r"app\.([0-9A-Za-z]+)\.chunk\.js", source.get("app_url", ""))
+    return match.group(1) if match else time.strftime("%Y%m%d")
+
+
+class CatalogDelta:
+    __slots__ = ("added", "removed", "changed")
+
+    def __init__(self) -> None:
+        self.added: List[str] = []
+        self.removed: List[str] = []
+        self.changed: List[str] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def describe(self) -> str:
+        return f"新增 {len(self.added)} 个，移除 {len(self.removed)} 个，更新 {len(self.changed)} 个"
+
+
+def apply_delta(
+    previous: List[Dict[str, str]],
+    fresh: List[Dict[str, str]],
+) -> Tuple[List[Dict[str, str]], CatalogDelta]:
+    """
+    将联网获取的列表合并到已有列表上，游戏集合与顺序以 fresh 为准。
+
+    fresh 中某个游戏没找到规则链接（“无”）时沿用已有的链接，前端 chunk 解析不完整时不会丢失已知信息。
+    """
+    delta = CatalogDelta()
+    known = {game["game_id"]: game for game in previous}
+    games: List[Dict[str, str]] = []
+    for game in fresh:
+        before = known.pop(game["game_id"], None)
+        if before is None:
+            delta.added.append(game["game_id"])
+        else:
+            if game.get("rule_link", "无") == "无" and before.get("rule_link", "无") != "无":
+                game = {**game, "rule_link": before["rule_link"]}
+            if game != before:
+                delta.changed.append(game["game_id"])
+        games.append(game)
+    delta.removed.extend(known)
+    return games, delta
+
+
+def write_snapshot(games_data: GamesData, path: Path = SNAPSHOT_PATH) -> str:
+    """将联网获取的游戏列表写为快照，返回快照版本"""
+    source = games_data.get("source") or {}
+    version = f"{time.strftime('%Y%m%d')}-{source_version(source)}"
+    snapshot = {
+        "version": version,
+        "generated_at": int(time.time()),
+        "source": source,
+        "games": games_data["games"],
+    }
+    path.write_text(json.dumps(snapshot, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return version
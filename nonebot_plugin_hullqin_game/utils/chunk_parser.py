@@ -0,0 +1,92 @@
+"""
+流式解析前端 chunk，边下载边按固定窗口扫描，找到所需内容后立即停止读取。
+
+相比整份下载后再做非锚定正则，峰值内存只与窗口大小有关，并且通常无需读完整个文件。
+"""
+import codecs
+import json
+import re
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, Optional, Set
+
+# 形如 r={uno:"UNO",lrs:"狼人杀"},o= 的游戏映射，值为 JSON 字符串
+GAME_MAP_PATTERN = re.compile(r'r=(\{[a-z0-9]+:"(?:[^"\\]|\\.)*"(?:,[a-z0-9]+:"(?:[^"\\]|\\.)*")*\}),o=')
+RULE_PATTERN = re.compile(r'gameKey:"([a-z0-9]+)",rule:""\.concat\(z,"([^"]+)"\)')
+GAME_MAP_OVERLAP = 128 * 1024
+RULE_OVERLAP = 1024
+
+
+@dataclass
+class ScanStats:
+    bytes_read: int = 0
+    elapsed: float = 0.0
+    stopped_early: bool = False
+
+    def describe(self) -> str:
+        suffix = "，已提前结束" if self.stopped_early else ""
+        return f"读取 {self.bytes_read} 字节，用时 {self.elapsed * 1000:.1f}ms{suffix}"
+
+
+async def scan_stream(
+    chunks: AsyncIterator[bytes],
+    pattern: re.Pattern,
+    on_match: Callable[[re.Match], bool],
+    overlap: int,
+) -> ScanStats:
+    """
+    逐块扫描文本流，on_match 返回 True 时停止读取。
+
+    每次只保留上一窗口末尾 overlap 个字符与新数据拼接，overlap 需不小于单次匹配的最大长度。
+    """
+    stats = ScanStats()
+    started = time.perf_counter()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    tail = ""
+    try:
+        async for chunk in chunks:
+            stats.bytes_read += len(chunk)
+            buffer = tail + decoder.decode(chunk)
+            consumed = 0
+            for match in pattern.finditer(buffer):
+                consumed = match.end()
+                if on_match(match):
+                    stats.stopped_early = True
+                    return stats
+            tail = buffer[max(consumed, len(buffer) - overlap):]
+
+        buffer = tail + decoder.decode(b"", final=True)
+        for match in pattern.finditer(buffer):
+            if on_match(match):
+                break
+        return stats
+    finally:
+        stats.elapsed = time.perf_counter() - started
+
+
+async def extract_game_map(chunks: AsyncIterator[bytes]) -> tuple[Optional[Dict[str, str]], ScanStats]:
+    """从 app chunk 中提取 游戏ID -> 游戏名称 映射"""
+    result: Dict[str, Dict[str, str]] = {}
+
+    def _on_match(match: re.Match) -> bool:
+        json_map = re.sub(r'([,{])([a-z0-9]+):', r'\1"\2":', match.group(1))
+        result["map"] = json.loads(json_map)
+        return True
+
+    stats = await scan_stream(chunks, GAME_MAP_PATTERN, _on_match, GAME_MAP_OVERLAP)
+    return result.get("map"), stats
+
+
+async def extract_rule_tokens(
+    chunks: AsyncIterator[bytes],
+    is_complete: Callable[[Set[str]], bool],
+) -> tuple[Dict[str, str], ScanStats]:
+    """从 index chunk 中提取 游戏ID -> 规则文章 token，is_complete 返回 True 时停止读取"""
+    tokens: Dict[str, str] = {}
+
+    def _on_match(match: re.Match) -> bool:
+        tokens[match.group(1)] = match.group(2)
+        return is_complete(set(tokens))
+
+    stats = await scan_stream(chunks, RULE_PATTERN, _on_match, RULE_OVERLAP)
+    return tokens, stats
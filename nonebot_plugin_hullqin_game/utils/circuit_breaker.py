@@ -0,0 +1,89 @@
+"""
+hullqin 主机级熔断。
+
+所有发往 hullqin 的请求结束时由 outbound_limiter 上报成败：连续失败 circuit_failure_threshold 次后熔断，
+circuit_open_seconds 内不再发起房间探测与页面抓取，查车直接列出缓存或不带人数的房间；
+冷却结束后进入半开状态，只放行一个试探请求，成功则恢复，失败则重新熔断。
+"""
+import time
+
+from nonebot import logger
+from ..config import config
+from .metrics import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_TEXT = {CLOSED: "正常", OPEN: "熔断", HALF_OPEN: "半开"}
+
+
+class CircuitOpenError(ConnectionError):
+    """熔断期间拒绝发起请求"""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, open_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_started = 0.0
+
+        metrics.gauge("hullqin_circuit_open", lambda: 0 if self.state == CLOSED else 1)
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    @property
+    def is_open(self) -> bool:
+        """处于熔断中且冷却未结束，用于提示用户，不改变状态"""
+        return self.state == OPEN and time.monotonic() - self._opened_at < self.open_seconds
+
+    def allow(self) -> bool:
+        """是否可以发起请求；冷却结束后转为半开，并放行一个试探请求"""
+        if self.state == CLOSED or not self.enabled:
+            return True
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now - self._opened_at < self.open_seconds:
+                return False
+            self.state = HALF_OPEN
+            logger.info("hullqin 熔断冷却结束，发起试探请求")
+        elif now - self._trial_started < self.open_seconds:
+            # 半开状态下已有试探请求在进行
+            return False
+        # 试探请求被取消时不会上报结果，超过冷却时间后允许再次试探
+        self._trial_started = now
+        return True
+
+    def record(self, ok: bool) -> None:
+        if not self.enabled:
+            return
+        if ok:
+            if self.state != CLOSED:
+                logger.info("hullqin 已恢复，解除熔断")
+            self.state = CLOSED
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            if self.state == CLOSED:
+                logger.warning(f"hullqin 连续 {self.failures} 次请求失败，{self.open_seconds:g} 秒内暂停探测")
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+            metrics.inc("hullqin_circuit_opened_total")
+
+    def describe(self) -> str:
+        text = f"hullqin 连接：{STATE_TEXT[self.state]}"
+        if self.state == OPEN:
+            remaining = max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+            text += f"，{remaining:.0f} 秒后试探"
+        elif self.failures:
+            text += f"，连续失败 {self.failures} 次"
+        return text
+
+
+hullqin_circuit = CircuitBreaker(config.circuit_failure_threshold, config.circuit_open_seconds)
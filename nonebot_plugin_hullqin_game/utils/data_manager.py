@@ -2,146 +2,362 @@
 """
 本模块负责插件的数据管理，包括文件路径管理和用户数据的加载与保存。
 hullqin_game/
-├── games_data.json # {"expired_time": 1769480810, "games": [{"game_name": "UNO", "game_id": "uno", "rule_link": "https://..."}, ...]}
-├── <group_id>.json # {"games": [{"expired_time": 1769480810, "game_name": "UNO", "game_id": "uno", "room_id": zmqq, "rule_link": "https://..."}, ...]}
+├── games_data.json # {"expired_time": 1769480810, "version": "hullqin-...", "games": [{"game_name": "UNO", "game_id": "uno", "rule_link": "https://..."}, ...]}
+├── <group_id>.json # {"v":2,"rooms":[["uno","zmqq",1769480810],...]}，只保存游戏ID、房间ID与过期时间，见 room_record.py
+├── hullqin_game.db # storage_backend 为 sqlite 时使用，首次启动自动导入上述 JSON 文件
+├── room_registry.db # room_registry_enabled 开启时多个进程共享的房间状态，见 room_registry.py
 └── ...
+
+实际读写由 storage 中的后端完成，见 storage.py。
+过期房间由 expiry_scheduler 在后台统一清理；后台预热登记已有房间之前，命令处理时顺带清理本群。
+游戏列表缺失或损坏时使用随插件发布的快照，联网刷新只应用增量，见 catalog_snapshot.py。
+有人的房间自动延期、长时间没人的房间提前移除，见 room_lifecycle.py。
+存储后端在首次访问时才创建，插件加载阶段不做任何文件读写；读写经由 storage.run 执行，SQLite 后端在工作线程中完成。
 """
-import json
+import asyncio
 import time
 
 from pathlib import Path
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Set, Tuple, Union
 
 import nonebot_plugin_localstore as store
 
+from nonebot import logger
+from ..config import config
+from .catalog_index import CatalogIndex
+from .catalog_snapshot import apply_delta, load_snapshot, source_version
+from .expiry_scheduler import ExpiryScheduler
 from .game_scraper import game_scraper
+from .room_lifecycle import EXTEND, RoomLifecycle
+from .room_record import Room
+from .storage import BaseStorage, create_storage, empty_games_data
 
 class DataManager:
     def __init__(self):
-        self.data_path: Path = Path(store.get_plugin_config_dir())
-        self.games_data_path: Path = self.data_path / "games_data.json"
-        self._init_data()
-
-    def _init_data(self):
-        self.data_path.mkdir(parents=True, exist_ok=True)
-        if not self.games_data_path.exists():
-            with open(self.games_data_path, "w", encoding="utf-8") as file:
-                json.dump({"expired_time": 0, "games": []}, file, ensure_ascii=False, indent=4)
-
-    
-    def load_games_data(self) -> Dict[str, Union[int, List[Dict[str, str]]]]:
-        """加载游戏数据"""
-        try:
-            with open(self.games_data_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {"expired_time": 0, "games": []}
-        
-    def save_games_data(self, games_data: Dict[str, Union[int, List[Dict[str, str]]]]):
+        self._storage: Optional[BaseStorage] = None
+        self._storage_lock = asyncio.Lock()
+        self.expiry = ExpiryScheduler(self._expire_groups)
+        self.lifecycle = RoomLifecycle()
+        self._observing: Set[asyncio.Task] = set()
+        # 每个群最近一次查车展示的房间及展示时间，封车 <序号> 按此解析，避免后台清理导致序号错位；
+        # 超过 room_listing_ttl 或本群通过命令增删房间后失效
+        self._listings: Dict[str, Tuple[float, List[Tuple[str, str]]]] = {}
+        # 已有房间的过期时间是否已登记到后台清理，登记前由命令顺带清理本群
+        self._stored_rooms_scheduled = False
+        self._group_locks = [asyncio.Lock() for _ in range(max(1, config.group_lock_stripes))]
+        self._games_data: Optional[Dict[str, Union[int, List[Dict[str, str]]]]] = None
+        self._catalog_index: Optional[CatalogIndex] = None
+        self._catalog_refresh_task: Optional[asyncio.Task] = None
+        self._catalog_retry_at: float = 0
+        game_scraper.room_pool.set_held_checker(self.is_room_held)
+        game_scraper.set_room_observer(self.observe_room)
+
+    @property
+    def storage(self) -> BaseStorage:
+        """存储后端，首次访问时创建；仅供同步场景（如性能测试）使用，插件内部使用 get_storage"""
+        if self._storage is None:
+            self.data_path: Path = Path(store.get_plugin_config_dir())
+            self._storage = create_storage(self.data_path)
+        return self._storage
+
+    async def get_storage(self) -> BaseStorage:
+        """存储后端，首次访问时在线程中创建，SQLite 后端的建表与迁移不阻塞事件循环"""
+        if self._storage is None:
+            async with self._storage_lock:
+                if self._storage is None:
+                    data_path = Path(store.get_plugin_config_dir())
+                    self._storage = await asyncio.to_thread(create_storage, data_path)
+                    self.data_path = data_path
+        return self._storage
+
+    async def load_games_data(self) -> Dict[str, Union[int, List[Dict[str, str]]]]:
+        """加载游戏数据，仅首次调用时读取存储；存储中没有游戏列表时使用内置快照"""
+        if self._games_data is None:
+            storage = await self.get_storage()
+            games_data = await storage.run(storage.load_catalog)
+            if self._games_data is not None:
+                # 读取期间已被刷新结果覆盖
+                return self._games_data
+            if not games_data.get("games"):
+                snapshot = await asyncio.to_thread(load_snapshot)
+                if snapshot is not None:
+                    logger.info(f"使用内置游戏列表快照 {snapshot['version']}，共 {len(snapshot['games'])} 个游戏")
+                    games_data = snapshot
+            self._games_data = games_data
+            self._update_catalog_index()
+        return self._games_data
+
+    async def save_games_data(self, games_data: Dict[str, Union[int, List[Dict[str, str]]]]):
         """保存游戏列表数据"""
-        with open(self.games_data_path, "w", encoding="utf-8") as f:
-            json.dump(games_data, f, ensure_ascii=False, indent=4)
-    
-    def reset_games_data(self):
+        storage = await self.get_storage()
+        await storage.run(storage.save_catalog, games_data)
+        self._games_data = games_data
+        self._update_catalog_index()
+
+    async def reset_games_data(self):
         """重置游戏列表数据"""
-        with open(self.games_data_path, "w", encoding="utf-8") as f:
-            json.dump({"expired_time": 0, "games": []}, f, ensure_ascii=False, indent=4)
-        
+        await self.save_games_data(empty_games_data())
+
+    def _update_catalog_index(self):
+        """仅在游戏列表版本变化时重建索引"""
+        games = self._games_data.get("games", [])
+        version = CatalogIndex.version_of(games)
+        if self._catalog_index is None or self._catalog_index.version != version:
+            self._catalog_index = CatalogIndex(games)
+            logger.debug(f"游戏列表索引已重建，共 {len(games)} 个游戏")
+
+    @property
+    def catalog_index(self) -> CatalogIndex:
+        """游戏列表索引，需先通过 load_games_data 或 get_games_list 加载游戏列表"""
+        if self._catalog_index is None:
+            return CatalogIndex([])
+        return self._catalog_index
+
     def search_game(self, game_name: str) -> Union[Dict[str, str], None]:
-        """在游戏数据中搜索游戏"""
-        games_data = self.load_games_data()
-        for game in games_data.get("games", []):
-            if game["game_id"] == game_name or game["game_name"] == game_name:
-                return game
+        """在游戏数据中搜索游戏，精确匹配优先，其次是唯一的前缀或子串匹配"""
+        index = self.catalog_index
+        game = index.get(game_name)
+        if game is not None:
+            return game
+        candidates = index.search(game_name, limit=2)
+        if candidates and candidates[0][0] >= CatalogIndex.SUBSTRING_SCORE:
+            if len(candidates) == 1 or candidates[1][0] < CatalogIndex.SUBSTRING_SCORE:
+                return candidates[0][1]
         return None
 
-    async def get_games_list(self) -> Dict[str, Union[int, List[Dict[str, str]]]]:
-        """获取游戏列表"""
-        games_data = self.load_games_data()
-        if games_data and int(time.time()) < games_data.get("expired_time", 0):
-            return games_data.get("games", [])
-        else:
-            games_data = await game_scraper.get_games_data()
-            self.save_games_data(games_data)
-            return games_data.get("games", [])
+    def suggest_games(self, game_name: str, limit: int = 5) -> List[Dict[str, str]]:
+        """按相似度返回候选游戏"""
+        return [game for _, game in self.catalog_index.search(game_name, limit=limit)]
 
+    async def get_games_list(self) -> List[Dict[str, str]]:
+        """获取游戏列表，过期时先返回旧列表并在后台刷新，没有任何数据时才等待刷新完成"""
+        games_data = await self.load_games_data()
+        games = games_data.get("games", [])
+        if games and int(time.time()) < games_data.get("expired_time", 0):
+            return games
+        if games:
+            if time.time() >= self._catalog_retry_at:
+                self._start_catalog_refresh()
+            return games
+        await self._start_catalog_refresh()
+        return (await self.load_games_data()).get("games", [])
 
-    def get_group_file_path(self, group_id: int) -> Path:
-        """获取群组的数据文件路径"""
-        return self.data_path / f"{group_id}.json"
+    def _start_catalog_refresh(self) -> asyncio.Task:
+        """启动后台刷新，同一时间只有一个刷新任务"""
+        if self._catalog_refresh_task is None or self._catalog_refresh_task.done():
+            self._catalog_refresh_task = asyncio.create_task(self.refresh_games_data())
+        return self._catalog_refresh_task
 
-    def load_group_data(self, group_id: int) -> Dict[str, List[Dict[str, any]]]:
-        """加载数据"""
+    async def refresh_games_data(self):
+        """从 hullqin 刷新游戏列表，失败时保留旧列表并在一段时间后重试"""
+        previous = await self.load_games_data()
         try:
-            with open(self.get_group_file_path(group_id), "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {"games": []}
+            games_data = await game_scraper.get_games_data(previous)
+        except Exception as e:
+            self._catalog_retry_at = time.time() + config.catalog_retry_interval
+            if previous.get("games"):
+                logger.warning(f"刷新游戏列表失败，继续使用旧列表: {e!r}")
+                return
+            raise
+        games, delta = apply_delta(previous.get("games", []), games_data["games"])
+        games_data["games"] = games
+        if delta or not previous.get("version"):
+            games_data["version"] = f"hullqin-{source_version(games_data.get('source') or {})}"
+            logger.info(f"游戏列表已更新到 {games_data['version']}：{delta.describe()}")
+        else:
+            games_data["version"] = previous["version"]
+        await self.save_games_data(games_data)
 
-    def save_group_data(self, group_id: int, group_data: Dict[str, List[Dict[str, any]]]):
+    async def load_group_data(self, group_id: int) -> Dict[str, List[Room]]:
+        """加载数据"""
+        await self._sweep_unscheduled(group_id)
+        storage = await self.get_storage()
+        return {"games": await storage.run(storage.get_rooms, str(group_id))}
+
+    async def save_group_data(self, group_id: int, group_data: Dict[str, List[Room]]):
         """保存数据"""
-        with open(self.get_group_file_path(group_id), "w", encoding="utf-8") as f:
-            json.dump(group_data, f, ensure_ascii=False, indent=4)
-            
-    def reset_group_data(self, group_id: int):
+        rooms = group_data.get("games", [])
+        storage = await self.get_storage()
+        await storage.run(storage.replace_rooms, str(group_id), rooms)
+        self._listings.pop(str(group_id), None)
+        for room in rooms:
+            self.expiry.schedule(str(group_id), room.expired_time)
+
+    async def reset_group_data(self, group_id: int):
         """重置群组数据"""
-        group_id = str(group_id)
-        with open(self.get_group_file_path(group_id), "w", encoding="utf-8") as f:
-            json.dump({"games": []}, f, ensure_ascii=False, indent=4)
+        storage = await self.get_storage()
+        await storage.run(storage.replace_rooms, str(group_id), [])
+        self._listings.pop(str(group_id), None)
+
+    def flush(self):
+        """将未写入的数据落盘"""
+        self.storage.flush()
+
+    async def close(self):
+        """落盘并关闭存储后端，从未使用过时什么也不做"""
+        if self._observing:
+            await asyncio.gather(*self._observing, return_exceptions=True)
+        if self._storage is None:
+            return
+        await self._storage.flush_async()
+        await self._storage.run(self._storage.close)
+
+    def group_lock(self, group_id: int) -> asyncio.Lock:
+        """群组锁，按群号分段，同一群的修改串行执行，不同群互不影响"""
+        return self._group_locks[hash(str(group_id)) % len(self._group_locks)]
+
+    def start_expiry(self):
+        """启动后台清理，不读取存储；之后加入的房间随加入登记"""
+        self.expiry.start()
+
+    async def schedule_stored_rooms(self):
+        """登记已有房间的过期时间，由后台预热调用"""
+        storage = await self.get_storage()
+        rooms = await storage.run(storage.all_rooms)
+        for group_id, room in rooms:
+            self.expiry.schedule(group_id, room.expired_time)
+        self._stored_rooms_scheduled = True
+        logger.info(f"过期清理已登记 {len(rooms)} 个已有房间")
 
-    def add_game_to_group(self, group_id: int, game_data: Dict):
+    async def _sweep_unscheduled(self, group_id: int):
+        """已有房间尚未登记（预热未完成或失败）时，顺带清理本群的过期房间"""
+        if not self._stored_rooms_scheduled:
+            storage = await self.get_storage()
+            await storage.run(storage.remove_expired, str(group_id), int(time.time()))
+
+    async def stop_expiry(self):
+        """停止后台清理"""
+        await self.expiry.stop()
+
+    async def _expire_groups(self, group_ids: Set[str], now: int):
+        storage = await self.get_storage()
+        removed = 0
+        for group_id in group_ids:
+            removed += await storage.run(storage.remove_expired, group_id, now)
+        if removed:
+            logger.debug(f"清理了 {len(group_ids)} 个群的 {removed} 个过期房间")
+
+    def observe_room(self, game_id: str, room_id: str, room_data: Dict[str, Union[int, List[str]]]):
+        """根据探测到的人数延长或提前移除房间，存储读写在后台任务中完成"""
+        task = asyncio.create_task(self._apply_observation(game_id, room_id, room_data["current"]))
+        self._observing.add(task)
+        task.add_done_callback(self._observing.discard)
+
+    async def _apply_observation(self, game_id: str, room_id: str, current: int):
+        key = (game_id, room_id)
+        try:
+            if not await self.is_room_held(game_id, room_id):
+                # 空闲房间池的候选房间等未登记的房间不做处理
+                self.lifecycle.forget(key)
+                return
+            action = self.lifecycle.observe(key, current, time.monotonic())
+            if action is None:
+                return
+
+            storage = await self.get_storage()
+            now = int(time.time())
+            if action == EXTEND:
+                # 剩余时间不足一半时才写入，实时监听频繁更新时不会反复写存储
+                expired_time = now + config.room_extend_time
+                for group_id in await storage.run(
+                    storage.extend_room, game_id, room_id, expired_time, now + config.room_extend_time // 2
+                ):
+                    self.expiry.schedule(group_id, expired_time)
+                return
+
+            group_ids = await storage.run(storage.groups_holding, game_id, room_id)
+            for group_id in group_ids:
+                await storage.run(storage.remove_room, group_id, game_id, room_id)
+            logger.info(
+                f"{game_id} 房间 {room_id} 连续 {config.room_empty_evict_after} 次无人，已从 {len(group_ids)} 个群移除"
+            )
+        except Exception as e:
+            logger.error(f"处理 {game_id} 房间 {room_id} 的状态失败: {e!r}")
+
+    def remember_listing(self, group_id: int, rooms: List[Room]):
+        """记录本群最近一次展示的房间顺序"""
+        self._listings[str(group_id)] = (time.monotonic(), [room.key for room in rooms])
+
+    async def resolve_listing_index(self, group_id: int, index: int) -> Optional[Tuple[str, str]]:
+        """将序号解析为 (游戏ID, 房间ID)，优先使用最近一次展示的顺序"""
+        return (await self.resolve_listing_indexes(group_id, [index]))[index]
+
+    async def resolve_listing_indexes(
+        self, group_id: int, indexes: List[int]
+    ) -> Dict[int, Optional[Tuple[str, str]]]:
+        """按同一份展示顺序解析多个序号，前面的房间被关闭不会让后面的序号错位"""
+        shown_at, listing = self._listings.get(str(group_id), (0.0, None))
+        if listing is None or time.monotonic() - shown_at >= config.room_listing_ttl:
+            self._listings.pop(str(group_id), None)
+            listing = [room.key for room in (await self.load_group_data(group_id))["games"]]
+        return {index: listing[index] if 0 <= index < len(listing) else None for index in indexes}
+
+    async def add_game_to_group(self, group_id: int, room: Room):
         """将游戏加入本群列表"""
-        group_data = self.load_group_data(group_id)
-        group_id = str(group_id)
-        if "games" not in group_data:
-            group_data["games"] = []
-        group_data["games"].append(game_data)
-        self.save_group_data(group_id, group_data)
-    
-    def remove_game_from_group(self, group_id: int, game_id: str, room_id: str):
+        storage = await self.get_storage()
+        await storage.run(storage.add_room, str(group_id), room)
+        self._listings.pop(str(group_id), None)
+        self.expiry.schedule(str(group_id), room.expired_time)
+
+    async def add_games_to_group(self, group_id: int, rooms: List[Room]):
+        """将多个游戏加入本群列表，整批只写入一次"""
+        storage = await self.get_storage()
+        await storage.run(storage.add_rooms, str(group_id), rooms)
+        self._listings.pop(str(group_id), None)
+        for expired_time in {room.expired_time for room in rooms}:
+            self.expiry.schedule(str(group_id), expired_time)
+
+    async def remove_game_from_group(self, group_id: int, game_id: str, room_id: str):
         """将游戏从本群列表中移除，通过ID定位"""
-        group_data = self.load_group_data(group_id)
-        group_id = str(group_id)
-        if "games" not in group_data:
-            group_data["games"] = []
-        for game in group_data["games"]:
-            if game["game_id"] == game_id and game["room_id"] == room_id:
-                group_data["games"].remove(game)
-                break
-        self.save_group_data(group_id, group_data)
-        
-    def remove_game_by_index(self, group_id: int, index: int):
+        storage = await self.get_storage()
+        await storage.run(storage.remove_room, str(group_id), game_id, room_id)
+        self._listings.pop(str(group_id), None)
+
+    async def remove_games_from_group(self, group_id: int, keys: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """将多个游戏从本群列表中移除，整批只写入一次，返回实际移除的 (游戏ID, 房间ID)"""
+        storage = await self.get_storage()
+        self._listings.pop(str(group_id), None)
+        return await storage.run(storage.remove_rooms, str(group_id), keys)
+
+    async def remove_game_by_index(self, group_id: int, index: int):
         """将游戏从本群列表中移除，通过索引定位"""
-        group_data = self.load_group_data(group_id)
-        group_id = str(group_id)
-        if "games" not in group_data:
-            group_data["games"] = []
-        if 0 <= index < len(group_data["games"]):
-            group_data["games"].pop(index)
-        self.save_group_data(group_id, group_data)
-
-    def check_game_exists(self, group_id: int, game_id: str, room_id: str) -> bool:
+        storage = await self.get_storage()
+        await storage.run(storage.remove_room_at, str(group_id), index)
+        self._listings.pop(str(group_id), None)
+
+    async def rooms_by_key(self) -> Dict[Tuple[str, str], Set[str]]:
+        """所有群登记的房间，(游戏ID, 房间ID) -> 群号集合"""
+        storage = await self.get_storage()
+        rooms: Dict[Tuple[str, str], Set[str]] = {}
+        for group_id, room in await storage.run(storage.all_rooms):
+            rooms.setdefault(room.key, set()).add(group_id)
+        return rooms
+
+    def game_name_of(self, game_id: str) -> str:
+        """游戏ID对应的名称，找不到时返回游戏ID"""
+        game = self.catalog_index.get(game_id)
+        return game["game_name"] if game else game_id
+
+    def rule_link_of(self, game_id: str) -> str:
+        """游戏ID对应的规则链接，找不到时返回“无”"""
+        game = self.catalog_index.get(game_id)
+        return game.get("rule_link", "无") if game else "无"
+
+    async def is_room_held(self, game_id: str, room_id: str) -> bool:
+        """检查房间是否已被任意群占用"""
+        storage = await self.get_storage()
+        return await storage.run(storage.room_held, game_id, room_id)
+
+    async def check_game_exists(self, group_id: int, game_id: str, room_id: str) -> bool:
         """检查游戏是否存在于本群列表中"""
-        group_data = self.load_group_data(group_id)
-        if "games" not in group_data:
-            group_data["games"] = []
-            return False
-        for game in group_data["games"]:
-            if game["game_id"] == game_id and game["room_id"] == room_id:
-                return True
-        return False
-
-    def remove_expired_games(self, group_id: int):
+        await self._sweep_unscheduled(group_id)
+        storage = await self.get_storage()
+        return await storage.run(storage.room_exists, str(group_id), game_id, room_id)
+
+    async def remove_expired_games(self, group_id: int):
         """移除过期的游戏"""
-        group_data = self.load_group_data(group_id)
-        group_id = str(group_id)
-        if "games" not in group_data:
-            group_data["games"] = []
-        group_data["games"] = [
-            game for game in group_data["games"]
-            if int(time.time()) < game["expired_time"]
-        ]
-        self.save_group_data(group_id, group_data)
+        storage = await self.get_storage()
+        await storage.run(storage.remove_expired, str(group_id), int(time.time()))
 
 
 data_manager = DataManager()
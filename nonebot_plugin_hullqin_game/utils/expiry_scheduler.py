@@ -0,0 +1,61 @@
+import asyncio
+import heapq
+import time
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+from nonebot import logger
+
+
+class ExpiryScheduler:
+    """按过期时间排序的最小堆，在后台统一清理所有群的过期房间"""
+
+    def __init__(self, on_expire: Callable[[Set[str], int], Awaitable[None]]) -> None:
+        self._on_expire = on_expire
+        self._heap: List[Tuple[int, str]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def schedule(self, group_id: str, expired_time: int) -> None:
+        """登记一个房间的过期时间，早于当前最近的过期时间时唤醒后台任务"""
+        is_earliest = not self._heap or expired_time < self._heap[0][0]
+        heapq.heappush(self._heap, (int(expired_time), group_id))
+        if is_earliest:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _pop_due(self, now: int) -> Set[str]:
+        group_ids: Set[str] = set()
+        while self._heap and self._heap[0][0] <= now:
+            _, group_id = heapq.heappop(self._heap)
+            group_ids.add(group_id)
+        return group_ids
+
+    async def _run(self) -> None:
+        while True:
+            now = int(time.time())
+            group_ids = self._pop_due(now)
+            if group_ids:
+                try:
+                    await self._on_expire(group_ids, now)
+                except Exception as e:
+                    logger.error(f"清理过期房间失败: {e!r}")
+                continue
+
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
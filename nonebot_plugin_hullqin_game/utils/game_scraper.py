@@ -1,73 +1,197 @@
 import asyncio
-import json
 import random
 import re
 import time
-from typing import Dict, List, Union, Optional
-import aiohttp
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Set, Tuple, TypeVar, Union, Optional
 from urllib.parse import urljoin
 
 from nonebot import logger
 from ..config import config
-from .room_ws_fetcher import fetch_room_data
+from .chunk_parser import extract_game_map, extract_rule_tokens
+from .circuit_breaker import CircuitOpenError, hullqin_circuit
+from .lazy_import import lazy_import
+from .metrics import metrics
+from .rate_limiter import outbound_limiter
+from .room_pool import RoomIdPool
+from .room_registry import RoomRegistry
+from .room_watcher import RoomWatcher
+from .room_ws_fetcher import fetch_room_data, random_gid
+from .ttl_cache import TTLCache
 
 ua =  "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/145.0.0.0 Safari/537.36 Edg/145.0.0.0"
-HOME_URL = "https://game.hullqin.cn/"
+HOME_URL = config.hullqin_home_url
 RULE_PREFIX = "https://mp.weixin.qq.com/s/"
 ROOM_ID_ALPHA = "qwertyupasdfghjkzxcvbnm"
 ROOM_ID_MIXED = "qwert0yu1pa2sd3fg4hj5kz6xc7vb8nm9"
 
+T = TypeVar("T")
+
+aiohttp = lazy_import("aiohttp")
+
 class GameScraper:
     def __init__(self) -> None:
-        self._game_name_map: Dict[str, str] | None = None
-        self._game_rule_map: Dict[str, str] | None = None
-        
-
-    async def _http_get_text(self, url: str, timeout: int = 15) -> str:
-        request_timeout = aiohttp.ClientTimeout(total=timeout)
-        async with aiohttp.ClientSession(timeout=request_timeout, headers={"User-Agent": ua}) as session:
-            async with session.get(url) as resp:
-                resp.raise_for_status()
-                return await resp.text(encoding="utf-8", errors="ignore")
-
-    async def _fetch_frontend_maps(self) -> tuple[Dict[str, str], Dict[str, str]]:
-        if self._game_name_map is not None and self._game_rule_map is not None:
-            return self._game_name_map, self._game_rule_map
-
-        home = await self._http_get_text(HOME_URL)
-        app_match = re.search(r'"(https://[^\"]*?/app\.[^\"]+?\.chunk\.js)"', home)
-        index_match = re.search(r'"(https://[^\"]*?/index\.[^\"]+?\.chunk\.js)"', home)
+        # ((app_url, index_url), name_map, rule_map)
+        self._frontend_maps: Optional[Tuple[Tuple[str, str], Dict[str, str], Dict[str, str]]] = None
+        self._room_cache: TTLCache[Tuple[str, str], Dict[str, Union[int, List[str]]]] = TTLCache(
+            config.room_status_cache_ttl, config.room_status_cache_size
+        )
+        self._room_inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        # 探测失败的房间：(连续失败次数, 下次允许探测的时间)，按写入顺序淘汰
+        self._room_failures: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self.room_pool = RoomIdPool(self._generate_room_id, self.get_room_data)
+        self.room_watcher = RoomWatcher(ua)
+        self._room_observer: Optional[Callable[[str, str, Dict[str, Union[int, List[str]]]], None]] = None
+        # 多进程共用数据目录时，通过登记表在进程间共享房间状态
+        self.room_registry: Optional[RoomRegistry] = RoomRegistry() if config.room_registry_enabled else None
+
+    def set_room_observer(self, observer: Callable[[str, str, Dict[str, Union[int, List[str]]]], None]) -> None:
+        """设置房间状态的观察者，每次探测或实时监听得到新状态时调用，观察者出错不影响探测"""
+
+        def _observe(game_id: str, room_id: str, data: Dict[str, Union[int, List[str]]]) -> None:
+            try:
+                observer(game_id, room_id, data)
+            except Exception as e:
+                logger.error(f"处理 {game_id} 房间 {room_id} 的状态失败: {e!r}")
+
+        self._room_observer = _observe
+        self.room_watcher.set_observer(_observe)
+
+    async def get_session(self) -> "aiohttp.ClientSession":
+        """获取共享的 HTTP 会话，首次使用时创建，复用连接池与 DNS 缓存"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=config.http_pool_size,
+                ttl_dns_cache=config.http_dns_cache_ttl,
+                keepalive_timeout=config.http_keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"User-Agent": ua},
+                cookie_jar=aiohttp.DummyCookieJar(),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """停止后台任务与进行中的探测并关闭共享的 HTTP 会话"""
+        inflight = list(self._room_inflight.values())
+        for future in inflight:
+            future.cancel()
+        await asyncio.gather(*inflight, return_exceptions=True)
+        await self.room_pool.close()
+        await self.room_watcher.close()
+        if self.room_registry is not None:
+            self.room_registry.close()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _fetch_home(self, source: Dict[str, str], timeout: int = 15) -> Optional[Dict[str, str]]:
+        """获取首页中的 chunk 地址，首页未变化（304）时返回 None"""
+        if not hullqin_circuit.allow():
+            raise CircuitOpenError("hullqin 暂时无法连接")
+        headers: Dict[str, str] = {}
+        if source.get("home_etag"):
+            headers["If-None-Match"] = source["home_etag"]
+        if source.get("home_last_modified"):
+            headers["If-Modified-Since"] = source["home_last_modified"]
+
+        session = await self.get_session()
+        async with outbound_limiter.request(track_latency=False):
+            with metrics.timer("hullqin_http_request_seconds", errors="hullqin_http_errors_total", target="home"):
+                async with session.get(HOME_URL, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                    if resp.status == 304:
+                        return None
+                    resp.raise_for_status()
+                    home = await resp.text(encoding="utf-8", errors="ignore")
+                    etag = resp.headers.get("ETag", "")
+                    last_modified = resp.headers.get("Last-Modified", "")
+
+        app_match = re.search(r'"([^\"]*?/app\.[^\"]+?\.chunk\.js)"', home)
+        index_match = re.search(r'"([^\"]*?/index\.[^\"]+?\.chunk\.js)"', home)
         if not app_match or not index_match:
             raise ValueError("未找到前端 chunk 地址")
 
-        app_url = urljoin(HOME_URL, app_match.group(1))
-        index_url = urljoin(HOME_URL, index_match.group(1))
-        app_js, index_js = await asyncio.gather(
-            self._http_get_text(app_url),
-            self._http_get_text(index_url),
-        )
+        return {
+            "home_etag": etag,
+            "home_last_modified": last_modified,
+            "app_url": urljoin(HOME_URL, app_match.group(1)),
+            "index_url": urljoin(HOME_URL, index_match.group(1)),
+        }
 
-        map_match = re.search(r'r=(\{.*?\}),o=', app_js)
-        if not map_match:
-            raise ValueError("未找到游戏映射")
+    async def _http_scan(
+        self,
+        url: str,
+        scanner: Callable[[AsyncIterator[bytes]], Awaitable[T]],
+        target: str,
+        timeout: int = 15,
+    ) -> T:
+        """以流的方式读取响应体并交给 scanner 处理，scanner 返回后不再继续读取"""
+        session = await self.get_session()
+        async with outbound_limiter.request(track_latency=False):
+            with metrics.timer("hullqin_http_request_seconds", errors="hullqin_http_errors_total", target=target):
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                    resp.raise_for_status()
+                    return await scanner(resp.content.iter_chunked(config.chunk_scan_window))
 
-        raw_map = map_match.group(1)
-        json_map = re.sub(r'([,{])([a-z0-9]+):', r'\1"\2":', raw_map)
-        name_map: Dict[str, str] = json.loads(json_map)
+    async def _fetch_frontend_maps(self, app_url: str, index_url: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """流式下载并解析 chunk，chunk 文件名带哈希，地址不变时复用上次的解析结果"""
+        if self._frontend_maps is not None and self._frontend_maps[0] == (app_url, index_url):
+            return self._frontend_maps[1], self._frontend_maps[2]
 
-        rule_map: Dict[str, str] = {}
-        for game_id, token in re.findall(r'gameKey:"([a-z0-9]+)",rule:""\.concat\(z,"([^\"]+)"\)', index_js):
-            rule_map[game_id] = f"{RULE_PREFIX}{token}"
+        expected_ids: Set[str] = set()
 
-        self._game_name_map = name_map
-        self._game_rule_map = rule_map
+        def _rules_complete(found: Set[str]) -> bool:
+            # 游戏映射就绪且每个游戏都找到了规则时提前结束
+            return bool(expected_ids) and expected_ids <= found
+
+        async def _scan_app() -> Dict[str, str]:
+            name_map, stats = await self._http_scan(app_url, extract_game_map, "app")
+            logger.debug(f"app chunk 解析完成，{stats.describe()}")
+            if name_map is None:
+                raise ValueError("未找到游戏映射")
+            expected_ids.update(game_id for game_id in name_map if game_id and game_id != "p")
+            return name_map
+
+        async def _scan_index() -> Dict[str, str]:
+            tokens, stats = await self._http_scan(
+                index_url, lambda chunks: extract_rule_tokens(chunks, _rules_complete), "index"
+            )
+            logger.debug(f"index chunk 解析完成，{stats.describe()}")
+            return tokens
+
+        started = time.perf_counter()
+        name_map, tokens = await asyncio.gather(_scan_app(), _scan_index())
+        rule_map = {game_id: f"{RULE_PREFIX}{token}" for game_id, token in tokens.items()}
+        logger.info(f"前端 chunk 解析用时 {(time.perf_counter() - started) * 1000:.1f}ms")
+
+        self._frontend_maps = ((app_url, index_url), name_map, rule_map)
         return name_map, rule_map
 
-    async def get_games_data(self) -> Dict[str, Union[int, List[Dict[str, str]]]]:
+    async def get_games_data(
+        self,
+        previous: Optional[Dict[str, Union[int, List[Dict[str, str]], Dict[str, str]]]] = None,
+    ) -> Dict[str, Union[int, List[Dict[str, str]], Dict[str, str]]]:
+        """获取游戏列表，传入上次的结果时，首页或 chunk 地址未变化则直接沿用上次的游戏列表"""
         logger.info("尝试获取游戏列表（优先 HTTP 解析）")
         expired_time = int(time.time()) + 86400 * 7
-        games = {"expired_time": expired_time, "games": []}
-        name_map, rule_map = await self._fetch_frontend_maps()
+        previous_games = (previous or {}).get("games") or []
+        previous_source: Dict[str, str] = (previous or {}).get("source") or {}
+
+        source = await self._fetch_home(previous_source if previous_games else {})
+        if source is None:
+            logger.info("首页未变化，沿用已有游戏列表")
+            return {"expired_time": expired_time, "games": previous_games, "source": previous_source}
+        if (
+            previous_games
+            and source["app_url"] == previous_source.get("app_url")
+            and source["index_url"] == previous_source.get("index_url")
+        ):
+            logger.info("前端 chunk 未变化，沿用已有游戏列表")
+            return {"expired_time": expired_time, "games": previous_games, "source": source}
+
+        games = {"expired_time": expired_time, "games": [], "source": source}
+        name_map, rule_map = await self._fetch_frontend_maps(source["app_url"], source["index_url"])
         for game_id, game_name in name_map.items():
             if not game_id or game_id == "p":
                 continue
@@ -81,17 +205,16 @@ class GameScraper:
 
         logger.info(f"HTTP 解析获取到 {len(games['games'])} 个游戏")
         return games
-    
+
     async def get_game_help(self, game_id: str) -> str:
         """获取游戏规则链接"""
-        _, rule_map = await self._fetch_frontend_maps()
+        source = await self._fetch_home({})
+        _, rule_map = await self._fetch_frontend_maps(source["app_url"], source["index_url"])
         return rule_map.get(game_id, "无")
-    
-    async def get_game_data(self, game_id: str, room_id: Optional[str] = None) -> Dict[str, str]:
-        """获取房间"""
-        expired_time = int(time.time()) + config.room_expired_time
-        if room_id:
-            return {"expired_time": expired_time, "room_id": room_id}
+
+    @staticmethod
+    def _generate_room_id() -> str:
+        """按 hullqin 前端的规则随机生成房间号"""
 
         def _pick_alpha() -> str:
             return ROOM_ID_ALPHA[random.randrange(len(ROOM_ID_ALPHA))]
@@ -100,22 +223,158 @@ class GameScraper:
             return str(random.randrange(10))
 
         v = random.randrange(3)
-        generated_room_id = (
+        return (
             _pick_alpha()
             + (_pick_alpha() if v else _pick_digit())
             + (ROOM_ID_MIXED[random.randrange(len(ROOM_ID_MIXED))] if v else _pick_digit())
             + _pick_digit()
         )
+
+    async def get_game_data(self, game_id: str, room_id: Optional[str] = None) -> Dict[str, str]:
+        """获取房间，优先使用空闲房间池中已确认空闲的房间号"""
+        expired_time = int(time.time()) + config.room_expired_time
+        if room_id:
+            return {"expired_time": expired_time, "room_id": room_id}
+
+        pooled_room_id = await self.room_pool.pop(game_id)
+        if pooled_room_id is not None:
+            logger.debug(f"为 {game_id} 分配空闲房间号: {pooled_room_id}")
+            return {"expired_time": expired_time, "room_id": pooled_room_id}
+
+        generated_room_id = self._generate_room_id()
         logger.debug(f"为 {game_id} 生成房间号: {generated_room_id}")
         return {"expired_time": expired_time, "room_id": generated_room_id}
 
+    async def get_game_data_batch(self, game_id: str, count: int) -> List[Dict[str, str]]:
+        """一次分配多个房间，规则与 get_game_data 相同，同一批内的房间号不重复"""
+        rooms: Dict[str, Dict[str, str]] = {}
+        while len(rooms) < count:
+            game_data = await self.get_game_data(game_id)
+            rooms.setdefault(game_data["room_id"], game_data)
+        return list(rooms.values())
+
+    def peek_room_data(self, game_id: str, room_id: str) -> Optional[Dict[str, Union[int, List[str]]]]:
+        """只读取实时监听或缓存中的房间状态，不发起探测"""
+        live = self.room_watcher.get(game_id, room_id)
+        if live is not None:
+            metrics.inc("hullqin_room_status_total", source="watcher")
+            return live
+
+        cached = self._room_cache.get((game_id, room_id))
+        if cached is not None:
+            metrics.inc("hullqin_room_status_total", source="cache")
+            return cached
+        return None
+
     async def get_room_data(self, game_id: str, room_id: str) -> Optional[Dict[str, Union[int, List[str]]]]:
-        gid = "rBE" + "".join(random.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789") for _ in range(17)) + "g=="
-        ws_data = await fetch_room_data(game_id=game_id, room_id=room_id, cookie_value=gid)
-        if ws_data is not None:
-            return ws_data
+        """获取房间状态，优先使用实时监听的结果，短时间内的重复请求复用缓存或正在进行的探测"""
+        known = self.peek_room_data(game_id, room_id)
+        if known is not None:
+            return known
+
+        key = (game_id, room_id)
+        inflight = self._room_inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._resolve_room(game_id, room_id))
+            self._room_inflight[key] = inflight
+            inflight.add_done_callback(lambda _: self._room_inflight.pop(key, None))
+        else:
+            metrics.inc("hullqin_room_status_total", source="inflight")
+        # shield 避免某个调用方被取消时连带取消其他调用方共享的探测
+        return await asyncio.shield(inflight)
+
+    async def _resolve_room(self, game_id: str, room_id: str) -> Optional[Dict[str, Union[int, List[str]]]]:
+        """
+        本进程缓存未命中时获取房间状态，开启登记表时先与其他进程协调。
+
+        最近探测失败、仍在退避期内的房间，以及 hullqin 熔断期间，直接返回 None 而不发起探测。
+        """
+        key = (game_id, room_id)
+        failure = self._room_failures.get(key)
+        if failure is not None and time.monotonic() < failure[1]:
+            metrics.inc("hullqin_room_status_total", source="backoff")
+            return None
+        if not hullqin_circuit.allow():
+            metrics.inc("hullqin_room_status_total", source="circuit_open")
+            return None
+
+        if self.room_registry is None:
+            data = await self._probe_room(game_id, room_id)
+        else:
+            data = await self.room_registry.fetch(game_id, room_id, lambda: self._probe_room(game_id, room_id))
+        if data is None:
+            self._record_room_failure(key)
         else:
-            logger.warning(f"未能获取到 {game_id} 房间 {room_id} 的数据")
+            self._room_failures.pop(key, None)
+            self._room_cache.set(key, data)
+            if self._room_observer is not None:
+                self._room_observer(game_id, room_id, data)
+        return data
+
+    def _record_room_failure(self, key: Tuple[str, str]) -> None:
+        """记录探测失败，下次探测的等待时间按连续失败次数指数增长"""
+        failures = self._room_failures.pop(key, (0, 0.0))[0] + 1
+        delay = min(config.room_failure_max_backoff, config.room_failure_backoff * 2 ** (failures - 1))
+        logger.warning(f"未能获取到 {key[0]} 房间 {key[1]} 的数据，{delay:g} 秒内不再探测")
+        if delay <= 0:
+            return
+        self._room_failures[key] = (failures, time.monotonic() + delay)
+        if len(self._room_failures) > config.room_status_cache_size:
+            del self._room_failures[next(iter(self._room_failures))]
+
+    async def _probe_room(self, game_id: str, room_id: str) -> Optional[Dict[str, Union[int, List[str]]]]:
+        metrics.inc("hullqin_room_status_total", source="probe")
+        gid = random_gid()
+        session = await self.get_session()
+        ws_data = await fetch_room_data(game_id=game_id, room_id=room_id, cookie_value=gid, session=session)
+        if ws_data is not None:
+            self._room_cache.set((game_id, room_id), ws_data)
+        return ws_data
+
+    def probe_rooms(
+        self,
+        rooms: List[Tuple[str, str]],
+        concurrency: Optional[int] = None,
+    ) -> List[asyncio.Task]:
+        """
+        为每个房间启动探测任务，顺序与 rooms 一致，调用方可以按完成情况逐步读取结果。
+
+        不再需要的任务由调用方取消；共享的探测不受影响，完成后照常写入缓存。
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency or config.room_probe_concurrency))
+
+        async def _probe(game_id: str, room_id: str) -> Optional[Dict[str, Union[int, List[str]]]]:
+            # 已有结果的房间不占用并发名额，可以立即返回
+            known = self.peek_room_data(game_id, room_id)
+            if known is not None:
+                return known
+            async with semaphore:
+                return await self.get_room_data(game_id, room_id)
+
+        return [asyncio.create_task(_probe(game_id, room_id)) for game_id, room_id in rooms]
+
+    @staticmethod
+    def room_task_result(task: asyncio.Task, game_id: str, room_id: str) -> Optional[Dict[str, Union[int, List[str]]]]:
+        """读取已结束的探测任务的结果，出错或被取消时返回 None"""
+        if task.cancelled():
+            return None
+        error = task.exception()
+        if error is not None:
+            logger.warning(f"获取 {game_id} 房间 {room_id} 的数据出错: {error!r}")
             return None
+        return task.result()
+
+    async def get_rooms_data(
+        self,
+        rooms: List[Tuple[str, str]],
+        concurrency: Optional[int] = None,
+    ) -> List[Optional[Dict[str, Union[int, List[str]]]]]:
+        """并发获取多个房间数据，结果顺序与 rooms 一致"""
+        tasks = self.probe_rooms(rooms, concurrency)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return [
+            self.room_task_result(task, game_id, room_id)
+            for task, (game_id, room_id) in zip(tasks, rooms)
+        ]
 
 game_scraper = GameScraper()
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""
+延迟导入。
+
+aiohttp、protobuf 生成代码等导入较慢，插件加载时只创建占位模块，首次访问其属性时才真正导入，
+之后属性直接从占位模块的 __dict__ 中读取，没有额外开销。
+
+注意：占位模块的属性在模块级的注解、默认值中被访问同样会触发导入，这类注解需写成字符串。
+"""
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    def _load(self) -> types.ModuleType:
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return module
+
+    def __getattr__(self, name: str):
+        return getattr(self._load(), name)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """返回延迟导入的模块，已经导入过时直接返回原模块"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
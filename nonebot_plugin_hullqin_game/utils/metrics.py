@@ -0,0 +1,270 @@
+"""
+插件内置指标（metrics_enabled 开启）。
+
+记录计数器、耗时直方图以及导出时才读取的 gauge，可导出为 Prometheus 文本格式：metrics_port 不为 0 时在本机提供 /metrics，
+metrics_file 不为空时定期写入文件；管理员可用 桌游状态 查看摘要。
+关闭时 inc/observe 直接返回，timer 返回共享的空上下文，几乎没有额外开销。
+"""
+import asyncio
+import bisect
+import contextlib
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from nonebot import logger
+from ..config import config
+from .lazy_import import lazy_import
+
+web = lazy_import("aiohttp.web")
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# 单位：秒，覆盖从本地读写到慢速网络请求
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "hullqin_http_request_seconds": "抓取 hullqin 页面的耗时",
+    "hullqin_http_errors_total": "抓取 hullqin 页面失败次数",
+    "hullqin_ws_connect_seconds": "房间 websocket 建立连接的耗时",
+    "hullqin_ws_first_frame_seconds": "连接建立后收到第一帧房间数据的耗时",
+    "hullqin_room_probe_total": "房间探测次数，按结果区分",
+    "hullqin_room_status_total": "房间状态的数据来源",
+    "hullqin_storage_seconds": "数据读写耗时",
+    "hullqin_command_seconds": "命令处理耗时",
+    "hullqin_command_errors_total": "命令处理出错次数",
+    "hullqin_outbound_throttled_total": "因令牌不足而等待的请求数",
+    "hullqin_outbound_decrease_total": "自适应并发窗口减半次数",
+    "hullqin_outbound_concurrency_limit": "当前请求并发窗口",
+    "hullqin_outbound_in_flight": "正在进行的请求数",
+    "hullqin_outbound_tokens": "令牌桶剩余令牌数",
+    "hullqin_outbound_latency_seconds": "房间探测的平滑延迟",
+    "hullqin_outbound_error_ratio": "请求的平滑错误率",
+    "hullqin_circuit_open": "hullqin 是否处于熔断或半开状态",
+    "hullqin_circuit_opened_total": "hullqin 熔断次数",
+}
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(DEFAULT_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(DEFAULT_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """按分桶估算分位数，返回所在桶的上界，落在最后一个桶时返回最大值"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(DEFAULT_BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_name", "_errors", "_labels", "_started")
+
+    def __init__(self, metrics: "Metrics", name: str, errors: Optional[str], labels: LabelKey) -> None:
+        self._metrics = metrics
+        self._name = name
+        self._errors = errors
+        self._labels = labels
+        self._started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._metrics._observe(self._name, time.perf_counter() - self._started, self._labels)
+        if exc_type is not None and self._errors and not issubclass(exc_type, asyncio.CancelledError):
+            self._metrics._inc(self._errors, 1, self._labels)
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for key, value in pairs
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metrics:
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._runner: Optional["web.AppRunner"] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """计数器加 value"""
+        if self.enabled:
+            self._inc(name, value, _label_key(labels))
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        """记录一次耗时"""
+        if self.enabled:
+            self._observe(name, seconds, _label_key(labels))
+
+    def gauge(self, name: str, read: Callable[[], float]) -> None:
+        """注册 gauge，导出时调用 read 取当前值"""
+        if self.enabled:
+            self._gauges[name] = read
+
+    def timer(self, name: str, errors: Optional[str] = None, **labels: str):
+        """
+        计时上下文，退出时记录耗时。
+
+        errors 为计数器名称，代码块抛出异常（取消除外）时以相同标签加一。
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, errors, _label_key(labels))
+
+    def _inc(self, name: str, value: float, labels: LabelKey) -> None:
+        series = self._counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + value
+
+    def _observe(self, name: str, seconds: float, labels: LabelKey) -> None:
+        series = self._histograms.setdefault(name, {})
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram()
+        histogram.observe(seconds)
+
+    def render(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        lines: List[str] = []
+        for name in sorted(self._counters):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(self._counters[name].items()):
+                lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+        for name in sorted(self._gauges):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_number(self._gauges[name]())}")
+        for name in sorted(self._histograms):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(self._histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip(DEFAULT_BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, (('le', repr(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(histogram.sum)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> List[str]:
+        """便于在聊天中阅读的摘要"""
+        lines: List[str] = []
+        for name in sorted(self._histograms):
+            for labels, histogram in sorted(self._histograms[name].items()):
+                label_text = ",".join(value for _, value in labels)
+                lines.append(
+                    f"{HELP.get(name, name)}[{label_text}]：{histogram.count} 次，"
+                    f"平均 {histogram.sum / histogram.count * 1000:.1f}ms，"
+                    f"p95 {histogram.quantile(0.95) * 1000:.1f}ms，"
+                    f"最大 {histogram.max * 1000:.1f}ms"
+                )
+        for name in sorted(self._counters):
+            for labels, value in sorted(self._counters[name].items()):
+                label_text = ",".join(value for _, value in labels)
+                lines.append(f"{HELP.get(name, name)}[{label_text}]：{_format_number(value)}")
+        return lines
+
+    async def start_export(self) -> None:
+        """按配置启动本地 /metrics 服务和定期写文件"""
+        if not self.enabled:
+            return
+        if config.metrics_port and self._runner is None:
+            app = web.Application()
+            app.router.add_get("/metrics", self._handle_metrics)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            try:
+                await web.TCPSite(runner, config.metrics_host, config.metrics_port).start()
+            except OSError as e:
+                # 端口被占用（如另一个机器人进程）时不影响机器人启动，只是不提供 /metrics
+                logger.warning(f"指标服务无法监听 {config.metrics_host}:{config.metrics_port}，已跳过: {e!r}")
+                await runner.cleanup()
+            else:
+                self._runner = runner
+                logger.info(f"指标已在 http://{config.metrics_host}:{config.metrics_port}/metrics 提供")
+        if config.metrics_file and (self._writer is None or self._writer.done()):
+            self._writer = asyncio.create_task(self._write_loop(Path(config.metrics_file)))
+
+    async def stop_export(self) -> None:
+        if self._writer is not None:
+            self._writer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._writer
+            self._writer = None
+            await asyncio.to_thread(self._write_file, Path(config.metrics_file), self.render())
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_metrics(self, request: "web.Request") -> "web.Response":
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    async def _write_loop(self, path: Path) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self._write_file, path, self.render())
+            except OSError as e:
+                logger.warning(f"写入指标文件失败: {e!r}")
+            await asyncio.sleep(config.metrics_write_interval)
+
+    @staticmethod
+    def _write_file(path: Path, text: str) -> None:
+        # 先写临时文件再替换，采集端不会读到半个文件
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+metrics = Metrics(config.metrics_enabled)
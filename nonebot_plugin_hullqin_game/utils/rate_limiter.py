@@ -0,0 +1,175 @@
+"""
+发往 hullqin 的请求限流。
+
+所有房间探测与页面抓取共用一个 OutboundLimiter：
+- 令牌桶限制每秒发起的请求数（outbound_rate，允许 outbound_burst 的突发）；
+- 并发窗口按 AIMD 自适应调整：延迟与错误率正常时每完成一个窗口的请求加一，
+  平滑延迟超过 outbound_latency_target 或平滑错误率超过 outbound_error_threshold 时减半，
+  减半之间至少间隔一个延迟目标，避免同一批失败把窗口一路压到底。
+窗口上限为 room_probe_global_concurrency，下限为 outbound_min_concurrency。
+
+每个请求的成败同时上报给 hullqin_circuit（见 circuit_breaker.py）。
+状态通过 metrics 的 gauge 导出，也会显示在 桌游状态 中。
+"""
+import asyncio
+import time
+
+from collections import deque
+from typing import Deque, List, Optional
+
+from ..config import config
+from .circuit_breaker import hullqin_circuit
+from .metrics import metrics
+
+# 平滑系数，越大越偏向最近的请求
+EWMA_ALPHA = 0.2
+DECREASE_FACTOR = 0.5
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """取一个令牌；令牌不足时先预订，再等待补足所需的时间，等待者按到达顺序放行"""
+        if self.rate <= 0:
+            return
+        self._refill()
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return
+        metrics.inc("hullqin_outbound_throttled_total")
+        try:
+            await asyncio.sleep(-self.tokens / self.rate)
+        except asyncio.CancelledError:
+            self.tokens += 1
+            raise
+
+
+class _Request:
+    __slots__ = ("_limiter", "_track_latency", "_started", "_failed")
+
+    def __init__(self, limiter: "OutboundLimiter", track_latency: bool) -> None:
+        self._limiter = limiter
+        self._track_latency = track_latency
+        self._started = 0.0
+        self._failed = False
+
+    def fail(self) -> None:
+        """标记本次请求失败（超时、连接错误等），计入错误率"""
+        self._failed = True
+
+    async def __aenter__(self) -> "_Request":
+        await self._limiter._acquire_slot()
+        try:
+            await self._limiter.bucket.acquire()
+        except BaseException:
+            self._limiter._release_slot()
+            raise
+        self._started = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self._limiter._release_slot()
+        if exc_type is not None and issubclass(exc_type, asyncio.CancelledError):
+            # 调用方放弃的请求不代表上游状况
+            return
+        ok = exc_type is None and not self._failed
+        latency = time.perf_counter() - self._started if self._track_latency and ok else None
+        self._limiter._feedback(ok, latency)
+        hullqin_circuit.record(ok)
+
+
+class OutboundLimiter:
+    def __init__(self) -> None:
+        self.bucket = TokenBucket(config.outbound_rate, config.outbound_burst)
+        self.max_limit = float(max(1, config.room_probe_global_concurrency))
+        self.min_limit = float(min(max(1, config.outbound_min_concurrency), self.max_limit))
+        self.limit = self.max_limit
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.error_ratio = 0.0
+        self._last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        metrics.gauge("hullqin_outbound_concurrency_limit", lambda: self.limit)
+        metrics.gauge("hullqin_outbound_in_flight", lambda: self.in_flight)
+        metrics.gauge("hullqin_outbound_tokens", lambda: max(self.bucket.tokens, 0.0))
+        metrics.gauge("hullqin_outbound_latency_seconds", lambda: self.latency or 0.0)
+        metrics.gauge("hullqin_outbound_error_ratio", lambda: self.error_ratio)
+
+    def request(self, track_latency: bool = True) -> _Request:
+        """
+        占用一个并发名额与一个令牌的上下文，退出时按结果调整并发窗口。
+
+        代码块抛出异常或调用 fail() 视为失败；track_latency 为 False 时只统计成败，
+        用于耗时与响应大小相关的页面抓取。
+        """
+        return _Request(self, track_latency)
+
+    async def _acquire_slot(self) -> None:
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # 已被唤醒却被取消时，把名额让给下一个等待者
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def _feedback(self, ok: bool, latency: Optional[float]) -> None:
+        self.error_ratio += EWMA_ALPHA * ((0.0 if ok else 1.0) - self.error_ratio)
+        if latency is not None:
+            self.latency = latency if self.latency is None else self.latency + EWMA_ALPHA * (latency - self.latency)
+
+        congested = self.error_ratio > config.outbound_error_threshold or (
+            self.latency is not None and self.latency > config.outbound_latency_target
+        )
+        if congested:
+            now = time.monotonic()
+            if now - self._last_decrease >= config.outbound_latency_target and self.limit > self.min_limit:
+                self.limit = max(self.min_limit, self.limit * DECREASE_FACTOR)
+                self._last_decrease = now
+                metrics.inc("hullqin_outbound_decrease_total")
+        elif ok and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._wake()
+
+    def describe(self) -> List[str]:
+        """便于在聊天中阅读的限流状态"""
+        latency = f"{self.latency * 1000:.0f}ms" if self.latency is not None else "暂无"
+        return [
+            f"请求并发窗口：{self.limit:.1f}（{self.min_limit:.0f}~{self.max_limit:.0f}），"
+            f"进行中 {self.in_flight}，排队 {len(self._waiters)}",
+            f"令牌：{max(self.bucket.tokens, 0):.1f}/{self.bucket.burst:.0f}，每秒 {self.bucket.rate:g} 个",
+            f"平滑延迟 {latency}，平滑错误率 {self.error_ratio:.0%}",
+        ]
+
+
+outbound_limiter = OutboundLimiter()
@@ -0,0 +1,132 @@
+"""
+房间帧的快速解码。
+
+直接在 memoryview 上遍历 protobuf 线格式，只取出 WsData.room.playerList 中每个玩家的 name 与 emoji，
+gameData、playersData 等不需要的字段按长度跳过，不做拷贝也不构造嵌套消息。
+遇到不认识的线格式或数据截断时抛出 FrameDecodeError，由调用方退回 ws_pb2 完整解析。
+
+字段编号来自 ws.proto：
+    WsData.room = 1
+    WsRoom.playerList = 6
+    WsPlayerInfo.emoji = 2, WsPlayerInfo.name = 4
+"""
+from typing import List, Optional, Tuple, Union
+
+WIRE_VARINT = 0
+WIRE_FIXED64 = 1
+WIRE_LENGTH_DELIMITED = 2
+WIRE_FIXED32 = 5
+
+DATA_ROOM = 1
+ROOM_PLAYER_LIST = 6
+PLAYER_EMOJI = 2
+PLAYER_NAME = 4
+
+DATA_FIELDS = (DATA_ROOM,)
+ROOM_FIELDS = (ROOM_PLAYER_LIST,)
+PLAYER_FIELDS = (PLAYER_EMOJI, PLAYER_NAME)
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class FrameDecodeError(ValueError):
+    """帧不符合预期的线格式"""
+
+
+def _read_varint(view: memoryview, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = view[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+        if shift >= 64:
+            raise FrameDecodeError("varint 过长")
+
+
+def _length_delimited_fields(
+    view: memoryview,
+    pos: int,
+    end: int,
+    wanted: Tuple[int, ...],
+) -> List[Tuple[int, int, int]]:
+    """
+    遍历 [pos, end) 内的字段，返回 wanted 中长度限定字段的 (字段编号, 值起点, 值终点)，其余字段直接跳过。
+
+    热路径上的单字节 varint 内联处理，只有多字节时才调用 _read_varint。
+    """
+    found: List[Tuple[int, int, int]] = []
+    while pos < end:
+        key = view[pos]
+        if key < 0x80:
+            pos += 1
+        else:
+            key, pos = _read_varint(view, pos)
+        field = key >> 3
+        wire = key & 0x07
+        if field == 0:
+            raise FrameDecodeError("字段编号为 0")
+
+        if wire == WIRE_LENGTH_DELIMITED:
+            length = view[pos]
+            if length < 0x80:
+                pos += 1
+            else:
+                length, pos = _read_varint(view, pos)
+            start = pos
+            pos += length
+            if field in wanted and pos <= end:
+                found.append((field, start, pos))
+        elif field in wanted:
+            raise FrameDecodeError(f"字段 {field} 线格式错误")
+        elif wire == WIRE_VARINT:
+            while view[pos] & 0x80:
+                pos += 1
+            pos += 1
+        elif wire == WIRE_FIXED64:
+            pos += 8
+        elif wire == WIRE_FIXED32:
+            pos += 4
+        else:
+            # group 等已废弃的线格式交给完整解析
+            raise FrameDecodeError(f"不支持的线格式 {wire}")
+
+        if pos > end:
+            raise FrameDecodeError("字段被截断")
+    return found
+
+
+def _decode_player(view: memoryview, start: int, end: int) -> Tuple[str, bytes]:
+    name = ""
+    emoji = b""
+    # proto3 中重复出现的标量字段以最后一次为准
+    for field, value_start, value_end in _length_delimited_fields(view, start, end, PLAYER_FIELDS):
+        if field == PLAYER_NAME:
+            name = str(view[value_start:value_end], "utf-8")
+        else:
+            emoji = view[value_start:value_end].tobytes()
+    return name, emoji
+
+
+def decode_room_players(data: Buffer) -> Optional[List[Tuple[str, bytes]]]:
+    """
+    解出房间内每个座位的 (name, emoji)，帧中没有 room 字段时返回 None。
+
+    room 重复出现时按 protobuf 的合并规则拼接 playerList；name 不是合法 UTF-8 时抛出 UnicodeDecodeError，
+    与 ws_pb2 一样视为无效帧。
+    """
+    view = memoryview(data)
+    try:
+        rooms = _length_delimited_fields(view, 0, len(view), DATA_FIELDS)
+        if not rooms:
+            return None
+        players: List[Tuple[str, bytes]] = []
+        for _, room_start, room_end in rooms:
+            for _, start, end in _length_delimited_fields(view, room_start, room_end, ROOM_FIELDS):
+                players.append(_decode_player(view, start, end))
+        return players
+    except IndexError:
+        raise FrameDecodeError("帧被截断") from None
@@ -0,0 +1,44 @@
+"""
+按房间人数调整房间的保留时间。
+
+每次探测或实时监听得到房间状态后由 DataManager 交给 RoomLifecycle 判断：
+- 有人的房间延长保留时间，至少保留到 room_extend_time 秒之后，游戏进行中的房间不会到期消失；
+- 连续 room_empty_evict_after 次观察到没人的房间提前移出列表，之后的查车不再探测它。
+  两次计数之间至少间隔 room_empty_observe_interval 秒，短时间内的多次查车只算一次，
+  刚发车、还没人进入的房间不会被误删。
+"""
+from typing import Dict, Optional, Tuple
+
+from ..config import config
+
+RoomKey = Tuple[str, str]
+
+EXTEND = "extend"
+EVICT = "evict"
+
+
+class RoomLifecycle:
+    def __init__(self) -> None:
+        # (连续无人次数, 上次计数的时间)
+        self._empty: Dict[RoomKey, Tuple[int, float]] = {}
+
+    def observe(self, key: RoomKey, current: int, now: float) -> Optional[str]:
+        """记录一次观察，返回应执行的操作（EXTEND、EVICT），无需操作时返回 None"""
+        if current > 0:
+            self._empty.pop(key, None)
+            return EXTEND if config.room_extend_time > 0 else None
+
+        if config.room_empty_evict_after <= 0:
+            return None
+        count, counted_at = self._empty.get(key, (0, 0.0))
+        if count and now - counted_at < config.room_empty_observe_interval:
+            return None
+        count += 1
+        if count >= config.room_empty_evict_after:
+            self._empty.pop(key, None)
+            return EVICT
+        self._empty[key] = (count, now)
+        return None
+
+    def forget(self, key: RoomKey) -> None:
+        self._empty.pop(key, None)
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from collections import Counter, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from nonebot import logger
+from ..config import config
+
+RoomData = Dict[str, Union[int, List[str]]]
+
+
+class RoomIdPool:
+    """为常用游戏预先探测并缓存一批确认空闲的房间号，发车时直接取用"""
+
+    def __init__(
+        self,
+        generate: Callable[[], str],
+        probe: Callable[[str, str], Awaitable[Optional[RoomData]]],
+    ) -> None:
+        self._generate = generate
+        self._probe = probe
+        self._is_held: Callable[[str, str], Awaitable[bool]] = self._never_held
+        self._pools: Dict[str, Deque[Tuple[str, float]]] = {}
+        self._demand: Counter = Counter()
+        self._refilling: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    async def _never_held(game_id: str, room_id: str) -> bool:
+        return False
+
+    def set_held_checker(self, is_held: Callable[[str, str], Awaitable[bool]]) -> None:
+        """设置判断房间是否已被任意群占用的方法"""
+        self._is_held = is_held
+
+    async def pop(self, game_id: str) -> Optional[str]:
+        """取出一个确认空闲的房间号，并在后台补充"""
+        self._demand[game_id] += 1
+        pool = self._pools.get(game_id)
+        room_id: Optional[str] = None
+        if pool:
+            deadline = time.monotonic() - config.room_pool_max_age
+            while pool:
+                candidate, verified_at = pool.popleft()
+                if verified_at >= deadline and not await self._is_held(game_id, candidate):
+                    room_id = candidate
+                    break
+        self._schedule_refill(game_id)
+        return room_id
+
+    def _is_popular(self, game_id: str) -> bool:
+        popular = self._demand.most_common(config.room_pool_games)
+        return any(popular_id == game_id for popular_id, _ in popular)
+
+    def _schedule_refill(self, game_id: str) -> None:
+        if config.room_pool_size <= 0 or not self._is_popular(game_id):
+            return
+        task = self._refilling.get(game_id)
+        if task is None or task.done():
+            self._refilling[game_id] = asyncio.create_task(self._refill(game_id))
+
+    async def _refill(self, game_id: str) -> None:
+        pool = self._pools.setdefault(game_id, deque())
+        deadline = time.monotonic() - config.room_pool_max_age
+        while pool and pool[0][1] < deadline:
+            pool.popleft()
+
+        attempts = 0
+        while len(pool) < config.room_pool_size and attempts < config.room_pool_size * 3:
+            attempts += 1
+            candidate = self._generate()
+            if any(room_id == candidate for room_id, _ in pool) or await self._is_held(game_id, candidate):
+                continue
+            try:
+                room_data = await self._probe(game_id, candidate)
+            except Exception as e:
+                logger.debug(f"探测 {game_id} 候选房间 {candidate} 出错: {e!r}")
+                continue
+            # 探测失败无法确认是否空闲，只收录明确没有玩家的房间
+            if room_data is not None and room_data["current"] == 0:
+                pool.append((candidate, time.monotonic()))
+        logger.debug(f"{game_id} 空闲房间池补充完成，当前 {len(pool)} 个")
+
+    async def close(self) -> None:
+        tasks = [task for task in self._refilling.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refilling.clear()
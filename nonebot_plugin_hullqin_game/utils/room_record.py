@@ -0,0 +1,55 @@
+"""
+群内登记的房间记录。
+
+记录只保存游戏ID、房间ID与过期时间，游戏名称和规则链接在展示时从游戏列表中查找，不再随每个房间重复保存。
+<group_id>.json 使用紧凑的数组格式：
+
+    {"v":2,"rooms":[["uno","zmqq",1769480810],...]}
+
+旧格式 {"games": [{"expired_time": ..., "game_name": ..., "game_id": ..., "room_id": ..., "rule_link": ...}]}
+照常读取，该群下次写入时转为新格式。
+"""
+import json
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+FORMAT_VERSION = 2
+
+
+class Room:
+    __slots__ = ("game_id", "room_id", "expired_time")
+
+    def __init__(self, game_id: str, room_id: str, expired_time: int) -> None:
+        self.game_id = game_id
+        self.room_id = room_id
+        self.expired_time = expired_time
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.game_id, self.room_id
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Room):
+            return NotImplemented
+        return (self.game_id, self.room_id, self.expired_time) == (other.game_id, other.room_id, other.expired_time)
+
+    def __repr__(self) -> str:
+        return f"Room({self.game_id!r}, {self.room_id!r}, {self.expired_time!r})"
+
+
+def rooms_from_json(data: Optional[Dict[str, Any]]) -> List[Room]:
+    """解析群数据文件的内容，兼容旧格式"""
+    if not data:
+        return []
+    rows = data.get("rooms")
+    if rows is not None:
+        return [Room(game_id, room_id, int(expired_time)) for game_id, room_id, expired_time in rows]
+    return [Room(game["game_id"], game["room_id"], int(game["expired_time"])) for game in data.get("games", [])]
+
+
+def rooms_to_json(rooms: Iterable[Room]) -> bytes:
+    return json.dumps(
+        {"v": FORMAT_VERSION, "rooms": [[room.game_id, room.room_id, room.expired_time] for room in rooms]},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
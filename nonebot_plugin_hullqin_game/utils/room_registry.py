@@ -0,0 +1,166 @@
+"""
+跨进程共享的房间状态登记表（room_registry_enabled 开启）。
+
+同一进程内，各群的同一房间已经通过状态缓存与正在进行的探测去重；多个机器人进程共用一个数据目录时，
+房间状态和“谁正在探测”额外记录在数据目录下的 room_registry.db（SQLite WAL）中：
+其他进程探测到的新鲜结果直接复用；同一房间同一时间只有一个进程持有探测租约，其余进程轮询等待结果，
+租约到期或持有者探测失败后由下一个进程接手。
+
+SQLite 读写在线程中进行，不阻塞事件循环；登记表出错时退回本进程直接探测。
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+import nonebot_plugin_localstore as store
+
+from nonebot import logger
+from ..config import config
+from .metrics import metrics
+
+RoomData = Dict[str, Union[int, List[str]]]
+RoomKey = Tuple[str, str]
+
+# 超过这个时间没有更新的记录在清理时删除，单位：秒
+PRUNE_AGE = 3600
+PRUNE_EVERY = 256
+
+
+class RoomRegistry:
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS room_status (
+        game_id TEXT NOT NULL,
+        room_id TEXT NOT NULL,
+        data TEXT,
+        observed_at REAL NOT NULL DEFAULT 0,
+        lease_owner TEXT,
+        lease_until REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (game_id, room_id)
+    ) WITHOUT ROWID;
+    """
+
+    def __init__(self, db_path: Optional[Path] = None) -> None:
+        self.db_path = db_path
+        self.owner = str(os.getpid())
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.db_path is None:
+                self.db_path = Path(store.get_plugin_config_dir()) / "room_registry.db"
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # 自动提交模式，每条语句即一个事务；timeout 为其他进程持有写锁时的等待时间
+            conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+            self._prune()
+        return self._conn
+
+    async def _call(self, func: Callable[..., any], *args):
+        def _run():
+            with self._lock:
+                return func(*args)
+
+        return await asyncio.to_thread(_run)
+
+    def _get(self, key: RoomKey, max_age: float) -> Optional[RoomData]:
+        row = self._connect().execute(
+            "SELECT data, observed_at FROM room_status WHERE game_id = ? AND room_id = ?", key
+        ).fetchone()
+        if row is None or row[0] is None or time.time() - row[1] >= max_age:
+            return None
+        return json.loads(row[0])
+
+    def _claim(self, key: RoomKey, lease: float) -> bool:
+        """租约空闲、已过期或本就属于本进程时取得探测租约"""
+        now = time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO room_status (game_id, room_id, lease_owner, lease_until) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(game_id, room_id) DO UPDATE SET "
+            "lease_owner = excluded.lease_owner, lease_until = excluded.lease_until "
+            "WHERE room_status.lease_until < ? OR room_status.lease_owner = excluded.lease_owner",
+            (*key, self.owner, now + lease, now),
+        )
+        return cursor.rowcount > 0
+
+    def _finish(self, key: RoomKey, data: Optional[RoomData]) -> None:
+        """写入探测结果并释放租约，探测失败时只释放租约"""
+        conn = self._connect()
+        if data is None:
+            conn.execute(
+                "UPDATE room_status SET lease_owner = NULL, lease_until = 0 "
+                "WHERE game_id = ? AND room_id = ? AND lease_owner = ?",
+                (*key, self.owner),
+            )
+            return
+        conn.execute(
+            "INSERT INTO room_status (game_id, room_id, data, observed_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(game_id, room_id) DO UPDATE SET data = excluded.data, observed_at = excluded.observed_at, "
+            "lease_owner = NULL, lease_until = 0",
+            (*key, json.dumps(data, ensure_ascii=False), time.time()),
+        )
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self._prune()
+
+    def _prune(self) -> None:
+        now = time.time()
+        self._conn.execute(
+            "DELETE FROM room_status WHERE observed_at < ? AND lease_until < ?",
+            (now - max(PRUNE_AGE, config.room_status_cache_ttl), now),
+        )
+
+    async def fetch(
+        self,
+        game_id: str,
+        room_id: str,
+        probe: Callable[[], Awaitable[Optional[RoomData]]],
+    ) -> Optional[RoomData]:
+        """
+        获取房间状态：登记表中有新鲜结果时直接返回；否则取得租约后调用 probe 并写回结果，
+        租约被其他进程持有时等待其结果，最长等待一个租约周期。
+        """
+        key = (game_id, room_id)
+        deadline = time.monotonic() + config.room_registry_lease
+        try:
+            while True:
+                data = await self._call(self._get, key, config.room_status_cache_ttl)
+                if data is not None:
+                    metrics.inc("hullqin_room_status_total", source="registry")
+                    return data
+                if await self._call(self._claim, key, config.room_registry_lease):
+                    break
+                if time.monotonic() >= deadline:
+                    logger.debug(f"等待其他进程探测 {game_id} 房间 {room_id} 超时，改为自行探测")
+                    return await probe()
+                await asyncio.sleep(config.room_registry_poll_interval)
+        except sqlite3.Error as e:
+            logger.warning(f"读取房间登记表失败，直接探测: {e!r}")
+            return await probe()
+
+        data = None
+        try:
+            data = await probe()
+        finally:
+            try:
+                # 被取消时同样释放租约，写回在线程中完成，不受取消影响
+                await asyncio.shield(self._call(self._finish, key, data))
+            except sqlite3.Error as e:
+                logger.warning(f"写入房间登记表失败: {e!r}")
+        return data
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,206 @@
+"""
+房间实时监听（可选，room_watcher_enabled 开启）。
+
+为所有群登记的房间各保持一条长连接，持续解码 WsData 更新，
+查车时直接读取内存中的最新人数；满员、清空时可向对应群推送提醒。
+长连接使用独立的连接池，大小为 room_watcher_max_connections，不占用探测与抓取共用的连接池。
+"""
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from nonebot import get_bot, logger
+from ..config import config
+from .lazy_import import lazy_import
+from .rate_limiter import outbound_limiter
+from .room_frame import FrameDecodeError
+from .room_ws_fetcher import WS_ORIGIN, _decode_room, random_gid, room_ws_request
+
+aiohttp = lazy_import("aiohttp")
+
+RoomKey = Tuple[str, str]
+RoomData = Dict[str, Union[int, List[str]]]
+
+
+class RoomWatcher:
+    def __init__(self, user_agent: str) -> None:
+        self._user_agent = user_agent
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._rooms_provider: Optional[Callable[[], Awaitable[Dict[RoomKey, Set[str]]]]] = None
+        self._name_resolver: Callable[[str], str] = lambda game_id: game_id
+        self._subscriptions: Dict[RoomKey, asyncio.Task] = {}
+        self._groups: Dict[RoomKey, Set[str]] = {}
+        self._snapshot: Dict[RoomKey, RoomData] = {}
+        self._empty_since: Dict[RoomKey, float] = {}
+        self._idle_until: Dict[RoomKey, float] = {}
+        self._sync_task: Optional[asyncio.Task] = None
+        self._sending: Set[asyncio.Task] = set()
+        self._observer: Optional[Callable[[str, str, RoomData], None]] = None
+
+    def set_observer(self, observer: Callable[[str, str, RoomData], None]) -> None:
+        """设置房间状态的观察者，每收到一帧房间数据时调用"""
+        self._observer = observer
+
+    async def _get_session(self) -> "aiohttp.ClientSession":
+        """监听专用的会话，首次建立连接时创建"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=max(1, config.room_watcher_max_connections),
+                ttl_dns_cache=config.http_dns_cache_ttl,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"User-Agent": self._user_agent},
+                cookie_jar=aiohttp.DummyCookieJar(),
+            )
+        return self._session
+
+    def get(self, game_id: str, room_id: str) -> Optional[RoomData]:
+        """读取连接中房间的最新状态，未监听时返回 None"""
+        return self._snapshot.get((game_id, room_id))
+
+    def start(
+        self,
+        rooms_provider: Callable[[], Awaitable[Dict[RoomKey, Set[str]]]],
+        name_resolver: Callable[[str], str],
+    ) -> None:
+        """
+        启动监听。
+
+        rooms_provider 返回当前需要监听的房间及其所在的群，name_resolver 将游戏ID转为游戏名称。
+        """
+        self._rooms_provider = rooms_provider
+        self._name_resolver = name_resolver
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def close(self) -> None:
+        tasks = list(self._subscriptions.values())
+        if self._sync_task is not None:
+            tasks.append(self._sync_task)
+            self._sync_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._subscriptions.clear()
+        self._snapshot.clear()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _sync_loop(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"同步监听房间失败: {e!r}")
+            await asyncio.sleep(config.room_watcher_sync_interval)
+
+    async def sync(self) -> None:
+        """按当前登记的房间增减订阅，长时间无人的房间暂停监听一段时间"""
+        if self._rooms_provider is None:
+            return
+        self._groups = await self._rooms_provider()
+        now = time.monotonic()
+
+        for key in list(self._subscriptions):
+            empty_since = self._empty_since.get(key)
+            idle = empty_since is not None and now - empty_since >= config.room_watcher_idle_timeout
+            if key not in self._groups or idle:
+                if idle:
+                    self._idle_until[key] = now + config.room_watcher_idle_timeout
+                self._unsubscribe(key)
+
+        for key in self._groups:
+            if len(self._subscriptions) >= config.room_watcher_max_connections:
+                break
+            if key in self._subscriptions or self._idle_until.get(key, 0) > now:
+                continue
+            self._subscriptions[key] = asyncio.create_task(self._watch(key))
+
+        for key in list(self._idle_until):
+            if key not in self._groups or self._idle_until[key] <= now:
+                del self._idle_until[key]
+
+    def _unsubscribe(self, key: RoomKey) -> None:
+        task = self._subscriptions.pop(key, None)
+        if task is not None:
+            task.cancel()
+        self._snapshot.pop(key, None)
+        self._empty_since.pop(key, None)
+
+    async def _watch(self, key: RoomKey) -> None:
+        game_id, room_id = key
+        backoff = 1.0
+        while True:
+            ws_url, headers = room_ws_request(game_id, room_id, random_gid())
+            try:
+                session = await self._get_session()
+                # 长连接不占用并发窗口，只在建立连接时消耗令牌
+                await outbound_limiter.bucket.acquire()
+                ws = await asyncio.wait_for(
+                    session.ws_connect(ws_url, origin=WS_ORIGIN, headers=headers, heartbeat=30),
+                    timeout=config.room_ws_connect_timeout,
+                )
+                async with ws:
+                    async for message in ws:
+                        if message.type != aiohttp.WSMsgType.BINARY:
+                            continue
+                        try:
+                            data = _decode_room(message.data)
+                        except FrameDecodeError:
+                            continue
+                        if data is not None:
+                            backoff = 1.0
+                            self._update(key, data)
+                logger.debug(f"监听的 {game_id} 房间 {room_id} 连接关闭")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.debug(f"监听 {game_id} 房间 {room_id} 失败: {e!r}")
+            except Exception as e:
+                # 其他异常同样按退避重连，避免该房间从此不再被监听
+                logger.error(f"监听 {game_id} 房间 {room_id} 出错，稍后重连: {e!r}")
+
+            # 断开期间不再提供该房间的实时状态，避免返回过时数据
+            self._snapshot.pop(key, None)
+            delay = min(backoff, config.room_watcher_max_backoff)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            backoff *= 2
+
+    def _update(self, key: RoomKey, data: RoomData) -> None:
+        previous = self._snapshot.get(key)
+        self._snapshot[key] = data
+
+        if data["current"] == 0:
+            self._empty_since.setdefault(key, time.monotonic())
+        else:
+            self._empty_since.pop(key, None)
+        if self._observer is not None:
+            self._observer(*key, data)
+
+        if previous is None or not config.room_watcher_notify:
+            return
+        game_id, room_id = key
+        game_name = self._name_resolver(game_id)
+        if data["total"] and data["current"] >= data["total"] > previous["current"]:
+            self._notify(key, f"📢 {game_name} 房间 {room_id} 已满员")
+        elif data["current"] == 0 and previous["current"] > 0:
+            self._notify(key, f"📢 {game_name} 房间 {room_id} 现在没人了")
+
+    def _notify(self, key: RoomKey, message: str) -> None:
+        group_ids = self._groups.get(key)
+        if group_ids:
+            task = asyncio.create_task(self._send(group_ids, message))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, group_ids: Set[str], message: str) -> None:
+        try:
+            bot = get_bot()
+        except ValueError:
+            return
+        for group_id in group_ids:
+            try:
+                await bot.send_group_msg(group_id=int(group_id), message=message)
+            except Exception as e:
+                logger.warning(f"向群 {group_id} 推送房间提醒失败: {e!r}")
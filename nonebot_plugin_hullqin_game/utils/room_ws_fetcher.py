@@ -1,20 +1,87 @@
 import asyncio
-from typing import Dict, List, Optional, Union
+import functools
+import random
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from nonebot import logger
+from ..config import config
+from .lazy_import import lazy_import
+from .metrics import metrics
+from .rate_limiter import outbound_limiter
+from .room_frame import FrameDecodeError, decode_room_players
+
+aiohttp = lazy_import("aiohttp")
+protobuf_message = lazy_import("google.protobuf.message")
+ws_pb2 = lazy_import(f"{__package__}.ws_pb2")
+
+WS_ORIGIN = config.hullqin_home_url.rstrip("/")
+
+
+@functools.lru_cache(maxsize=None)
+def _use_fast_decoder() -> bool:
+    if config.room_frame_decoder != "auto":
+        return config.room_frame_decoder == "fast"
+    # upb 等 C 实现整帧解析比 Python 遍历线格式更快，只有纯 Python 实现时快速解码才划算
+    try:
+        from google.protobuf.internal import api_implementation
+    except ImportError:
+        return False
+    return api_implementation.Type() == "python"
+
+
+def warm_decoder() -> None:
+    """提前导入解码所需的模块并注册 ws_pb2 描述符，避免首次查车时才加载"""
+    _use_fast_decoder()
+    ws_pb2.WsData()
+
 
-from .ws_pb2 import WsData
+def random_gid() -> str:
+    """生成访客 cookie 中的 gid"""
+    return "rBE" + "".join(random.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789") for _ in range(17)) + "g=="
+
+
+def room_ws_request(game_id: str, room_id: str, cookie_value: str) -> Tuple[str, Dict[str, str]]:
+    """房间 websocket 的地址与请求头"""
+    ws_url = f"{config.hullqin_ws_url.rstrip('/')}/{game_id}/{room_id}?v=1"
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120 Safari/537.36",
+        "Cookie": f"gid={cookie_value}",
+    }
+    return ws_url, headers
 
 
 def _decode_room(binary_data: bytes) -> Optional[Dict[str, Union[int, List[str]]]]:
-    msg = WsData()
-    msg.ParseFromString(binary_data)
-    if not msg.room:
+    """解析房间帧，不是房间数据时返回 None，无效帧抛出 FrameDecodeError"""
+    if _use_fast_decoder():
+        try:
+            seats = decode_room_players(binary_data)
+        except (FrameDecodeError, UnicodeDecodeError):
+            # 快速解码处理不了的帧交给 ws_pb2，由它决定是否为无效帧
+            pass
+        else:
+            return _summarize_room(seats) if seats is not None else None
+    return _decode_room_full(binary_data)
+
+
+def _decode_room_full(binary_data: bytes) -> Optional[Dict[str, Union[int, List[str]]]]:
+    """用 ws_pb2 完整解析，作为快速解码的兜底与对照"""
+    msg = ws_pb2.WsData()
+    try:
+        msg.ParseFromString(binary_data)
+    except protobuf_message.DecodeError as e:
+        raise FrameDecodeError(str(e)) from e
+    if not msg.HasField("room"):
         return None
+    return _summarize_room([(player.name, player.emoji) for player in msg.room.playerList])
+
 
+def _summarize_room(seats: List[Tuple[str, bytes]]) -> Dict[str, Union[int, List[str]]]:
     players: List[str] = []
-    total = len(msg.room.playerList)
-    for player in msg.room.playerList:
-        name = player.name.strip() if player.name else ""
-        emoji = bytes(player.emoji).decode("utf-8", errors="ignore").strip() if player.emoji else ""
+    total = len(seats)
+    for raw_name, raw_emoji in seats:
+        name = raw_name.strip() if raw_name else ""
+        emoji = bytes(raw_emoji).decode("utf-8", errors="ignore").strip() if raw_emoji else ""
 
         # 登录用户用 name，匿名用户用 emoji；两者都空视为空位。
         if not (name or emoji):
@@ -33,53 +100,71 @@ def _decode_room(binary_data: bytes) -> Optional[Dict[str, Union[int, List[str]]
     }
 
 
+async def _receive_room(
+    session: "aiohttp.ClientSession",
+    ws_url: str,
+    headers: Dict[str, str],
+) -> Optional[Dict[str, Union[int, List[str]]]]:
+    """连接房间 websocket，读取到第一帧房间数据后立即关闭"""
+    with metrics.timer("hullqin_ws_connect_seconds"):
+        ws = await asyncio.wait_for(
+            session.ws_connect(ws_url, origin=WS_ORIGIN, headers=headers),
+            timeout=config.room_ws_connect_timeout,
+        )
+    connected_at = time.perf_counter()
+    try:
+        while True:
+            message = await ws.receive(timeout=config.room_ws_frame_timeout)
+            if message.type == aiohttp.WSMsgType.BINARY:
+                try:
+                    data = _decode_room(message.data)
+                except FrameDecodeError:
+                    continue
+                if data is not None:
+                    metrics.observe("hullqin_ws_first_frame_seconds", time.perf_counter() - connected_at)
+                    return data
+            elif message.type in (
+                aiohttp.WSMsgType.CLOSE,
+                aiohttp.WSMsgType.CLOSING,
+                aiohttp.WSMsgType.CLOSED,
+                aiohttp.WSMsgType.ERROR,
+            ):
+                return None
+    finally:
+        await ws.close()
+
+
 async def fetch_room_data(
     game_id: str,
     room_id: str,
     cookie_value: str,
+    session: Optional["aiohttp.ClientSession"] = None,
 ) -> Optional[Dict[str, Union[int, List[str]]]]:
-    import websocket
-
-    ws_url = f"wss://game.hullqin.cn/{game_id}/{room_id}?v=1"
-    holder: dict[str, Optional[Dict[str, Union[int, List[str]]]]] = {"result": None}
-    done = asyncio.Event()
-
-    def _on_open(_ws):
-        return None
-
-    def _on_message(ws, message):
-        if isinstance(message, bytes):
-            data = _decode_room(message)
-            if data is not None:
-                holder["result"] = data
-                done.set()
-                ws.close()
-
-    def _on_error(_ws, _err):
-        done.set()
-
-    def _on_close(_ws, _code, _msg):
-        done.set()
-
-    ws = websocket.WebSocketApp(
-        ws_url,
-        header=[
-            "Origin: https://game.hullqin.cn",
-            "User-Agent: Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120 Safari/537.36",
-            f"Cookie: gid={cookie_value}",
-        ],
-        on_open=_on_open,
-        on_message=_on_message,
-        on_error=_on_error,
-        on_close=_on_close,
-    )
-
-    thread_task = asyncio.to_thread(ws.run_forever)
-    runner = asyncio.create_task(thread_task)
-    try:
-        await done.wait()
-    finally:
-        ws.close()
-        await runner
-
-    return holder["result"]
+    """探测房间状态，未传入 session 时使用临时会话；受 outbound_limiter 限流，排队时间不计入超时"""
+    ws_url, headers = room_ws_request(game_id, room_id, cookie_value)
+
+    async with outbound_limiter.request() as request:
+        try:
+            if session is not None:
+                data = await asyncio.wait_for(
+                    _receive_room(session, ws_url, headers),
+                    timeout=config.room_ws_total_timeout,
+                )
+            else:
+                async with aiohttp.ClientSession() as temp_session:
+                    data = await asyncio.wait_for(
+                        _receive_room(temp_session, ws_url, headers),
+                        timeout=config.room_ws_total_timeout,
+                    )
+        except asyncio.TimeoutError:
+            request.fail()
+            metrics.inc("hullqin_room_probe_total", result="timeout")
+            logger.debug(f"{game_id} 房间 {room_id} 探测超时")
+        except aiohttp.ClientError as e:
+            request.fail()
+            metrics.inc("hullqin_room_probe_total", result="error")
+            logger.debug(f"{game_id} 房间 {room_id} 连接失败: {e!r}")
+        else:
+            metrics.inc("hullqin_room_probe_total", result="ok" if data is not None else "closed")
+            return data
+    return None
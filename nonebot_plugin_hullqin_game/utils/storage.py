@@ -0,0 +1,699 @@
+# -*- coding: utf-8 -*-
+"""
+本模块提供群组房间与游戏列表的存储后端，由 DataManager 统一调用。
+
+房间统一以 room_record.Room 表示，只保存游戏ID、房间ID与过期时间。
+
+- JsonStorage: 默认后端，每个群一个 <group_id>.json（紧凑格式，见 room_record.py），内存为准并合并延迟写回。
+  游戏列表同样延迟写回。写入先落到临时文件并 fsync，再原子替换原文件，写文件在线程中进行，不阻塞事件循环；
+  首次访问某个群或游戏列表时，run 先在线程中读取文件，之后的操作只涉及内存，直接在事件循环中执行。
+- SqliteStorage: 可选后端，所有数据存放在 hullqin_game.db 中，按索引查询。
+  WAL 模式下可由多个进程同时使用，多个机器人进程共用数据目录时应选择此后端。
+  DataManager 通过 run 调用各方法，SQLite 后端在工作线程中串行执行，不阻塞事件循环。
+"""
+import asyncio
+import contextlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, TypeVar, Union
+
+from nonebot import logger
+from ..config import config
+from .metrics import metrics
+from .room_record import Room, rooms_from_json, rooms_to_json
+
+GROUP_FILE_PATTERN = re.compile(r"^\d+\.json$")
+
+T = TypeVar("T")
+
+
+def _reads_files(scope: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    标记 JsonStorage 中首次访问需要读文件的操作，run 会先在线程中读取：
+    group 为第一个参数指定的群，all 为数据目录中的所有群，catalog 为游戏列表。
+    """
+
+    def decorator(fn: Callable[..., T]) -> Callable[..., T]:
+        fn.reads_files = scope
+        return fn
+
+    return decorator
+
+
+def empty_games_data() -> Dict[str, Union[int, List[Dict[str, str]]]]:
+    return {"expired_time": 0, "games": []}
+
+
+def _read_json(path: Path) -> Optional[Dict[str, any]]:
+    """读取 JSON 文件，文件损坏时备份后返回 None，避免被空数据覆盖而丢失"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        backup_path = path.with_name(f"{path.name}.corrupt-{int(time.time())}")
+        logger.error(f"{path.name} 已损坏，已备份为 {backup_path.name}: {e!r}")
+        with contextlib.suppress(OSError):
+            os.replace(path, backup_path)
+        return None
+
+
+def _atomic_write(path: Path, data: bytes):
+    """写入临时文件并 fsync 后替换原文件，中途崩溃不会留下半个文件"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+    # 同步目录项，保证替换本身落盘；部分平台不支持打开目录
+    with contextlib.suppress(OSError):
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def _dump_json(data: Dict[str, any]) -> bytes:
+    return json.dumps(data, ensure_ascii=False, indent=4).encode("utf-8")
+
+
+def _lock_data_dir(data_path: Path) -> Optional[IO]:
+    """对数据目录加进程锁，返回需一直持有的锁文件；已被其他进程持有时返回 None"""
+    try:
+        import fcntl
+    except ImportError:
+        # 非 POSIX 平台不做检测
+        return open(os.devnull, "w")
+    lock_file = open(data_path / ".json_storage.lock", "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+class BaseStorage:
+    """存储后端接口，群号统一使用字符串"""
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """在事件循环中执行存储操作：默认直接调用，数据在内存中的后端无需切换线程"""
+        return fn(*args)
+
+    def load_catalog(self) -> Dict[str, Union[int, List[Dict[str, str]]]]:
+        """加载游戏列表数据"""
+        raise NotImplementedError
+
+    def save_catalog(self, games_data: Dict[str, Union[int, List[Dict[str, str]]]]):
+        """保存游戏列表数据"""
+        raise NotImplementedError
+
+    def get_rooms(self, group_id: str) -> List[Room]:
+        """按加入顺序获取群内房间，返回新的列表，之后的修改不会影响已返回的列表"""
+        raise NotImplementedError
+
+    def replace_rooms(self, group_id: str, rooms: List[Room]):
+        """整体替换群内房间"""
+        raise NotImplementedError
+
+    def add_room(self, group_id: str, room: Room):
+        """向群内追加房间"""
+        raise NotImplementedError
+
+    def add_rooms(self, group_id: str, rooms: List[Room]):
+        """向群内追加多个房间，只写入一次"""
+        raise NotImplementedError
+
+    def remove_room(self, group_id: str, game_id: str, room_id: str) -> bool:
+        """通过游戏ID与房间ID移除房间"""
+        raise NotImplementedError
+
+    def remove_rooms(self, group_id: str, keys: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """通过 (游戏ID, 房间ID) 移除多个房间，只写入一次，返回实际移除的房间"""
+        raise NotImplementedError
+
+    def remove_room_at(self, group_id: str, index: int) -> bool:
+        """通过索引移除房间"""
+        raise NotImplementedError
+
+    def room_exists(self, group_id: str, game_id: str, room_id: str) -> bool:
+        """检查房间是否存在"""
+        raise NotImplementedError
+
+    def remove_expired(self, group_id: str, now: int) -> int:
+        """移除群内过期房间，返回移除数量"""
+        raise NotImplementedError
+
+    def iter_all_rooms(self) -> Iterator[Tuple[str, Room]]:
+        """遍历所有群的房间"""
+        raise NotImplementedError
+
+    def all_rooms(self) -> List[Tuple[str, Room]]:
+        """所有群的房间，供 run 调用"""
+        return list(self.iter_all_rooms())
+
+    def room_held(self, game_id: str, room_id: str) -> bool:
+        """检查房间是否被任意群占用"""
+        raise NotImplementedError
+
+    def groups_holding(self, game_id: str, room_id: str) -> List[str]:
+        """登记了该房间的所有群"""
+        raise NotImplementedError
+
+    def extend_room(self, game_id: str, room_id: str, expired_time: int, before: int) -> List[str]:
+        """将所有群中过期时间早于 before 的该房间延长到 expired_time，返回涉及的群"""
+        raise NotImplementedError
+
+    def flush(self):
+        """将未写入的数据落盘"""
+
+    async def flush_async(self):
+        """将未写入的数据落盘，不阻塞事件循环"""
+        self.flush()
+
+    def close(self):
+        """关闭存储后端"""
+        self.flush()
+
+
+class JsonStorage(BaseStorage):
+    def __init__(self, data_path: Path):
+        self.data_path = data_path
+        self.games_data_path: Path = self.data_path / "games_data.json"
+        self._groups: Dict[str, List[Room]] = {}
+        # 数据目录中的群文件是否已全部读入，跨群查询需要所有群的数据
+        self._all_groups_loaded = False
+        self._dirty_groups: Set[str] = set()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self._flush_lock = asyncio.Lock()
+        # 待写回的游戏列表，已在调用线程中序列化
+        self._pending_catalog: Optional[bytes] = None
+        # 每个进程各自在内存中缓存群数据，多个进程同时写 JSON 会互相覆盖
+        self._process_lock = _lock_data_dir(data_path)
+        if self._process_lock is None:
+            logger.warning(
+                f"数据目录 {data_path} 正被另一个进程以 JSON 存储使用，数据可能互相覆盖；"
+                "多个机器人进程共用数据目录时请设置 storage_backend=sqlite"
+            )
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """内存中已有的数据直接在事件循环中操作，首次访问需要读的文件先在线程中读取"""
+        scope = getattr(fn, "reads_files", None)
+        if scope == "catalog" and self._pending_catalog is None:
+            return await asyncio.to_thread(fn, *args)
+        if scope == "group":
+            await self._preload_groups([args[0]])
+        elif scope == "all":
+            await self._preload_groups(None)
+        return fn(*args)
+
+    async def _preload_groups(self, group_ids: Optional[List[str]]):
+        """在线程中读取尚未加载的群文件，group_ids 为 None 时读取数据目录中的所有群"""
+        if group_ids is None:
+            if self._all_groups_loaded:
+                return
+        elif all(group_id in self._groups for group_id in group_ids):
+            return
+        loaded = await asyncio.to_thread(self._read_group_files, set(self._groups), group_ids)
+        for group_id, rooms in loaded.items():
+            # 读取期间已在事件循环中加载或替换的群以内存为准
+            self._groups.setdefault(group_id, rooms)
+        if group_ids is None:
+            self._all_groups_loaded = True
+
+    def _load_all_groups(self):
+        """不经 run 直接调用时的兜底，在当前线程读取尚未加载的群"""
+        if self._all_groups_loaded:
+            return
+        for group_id, rooms in self._read_group_files(set(self._groups), None).items():
+            self._groups.setdefault(group_id, rooms)
+        self._all_groups_loaded = True
+
+    def _read_group_files(self, known: Set[str], group_ids: Optional[List[str]]) -> Dict[str, List[Room]]:
+        if group_ids is None:
+            group_ids = [
+                group_file.stem
+                for group_file in self.data_path.glob("*.json")
+                if GROUP_FILE_PATTERN.match(group_file.name)
+            ]
+        return {group_id: self._read_group_file(group_id) for group_id in group_ids if group_id not in known}
+
+    @_reads_files("catalog")
+    def load_catalog(self) -> Dict[str, Union[int, List[Dict[str, str]]]]:
+        if self._pending_catalog is not None:
+            return json.loads(self._pending_catalog)
+        with metrics.timer("hullqin_storage_seconds", op="load_catalog"):
+            return _read_json(self.games_data_path) or empty_games_data()
+
+    def save_catalog(self, games_data: Dict[str, Union[int, List[Dict[str, str]]]]):
+        """与群数据一样延迟写回"""
+        with metrics.timer("hullqin_storage_seconds", op="serialize"):
+            self._pending_catalog = _dump_json(games_data)
+        self._schedule_flush()
+
+    def _write_catalog_file(self, data: bytes):
+        try:
+            with metrics.timer("hullqin_storage_seconds", op="save_catalog"):
+                _atomic_write(self.games_data_path, data)
+        except OSError as e:
+            logger.error(f"写入游戏列表失败: {e!r}")
+            if self._pending_catalog is None:
+                self._pending_catalog = data
+
+    def get_group_file_path(self, group_id: str) -> Path:
+        """获取群组的数据文件路径"""
+        return self.data_path / f"{group_id}.json"
+
+    def _read_group_file(self, group_id: str) -> List[Room]:
+        with metrics.timer("hullqin_storage_seconds", op="load_group"):
+            return rooms_from_json(_read_json(self.get_group_file_path(group_id)))
+
+    def _load_group(self, group_id: str) -> List[Room]:
+        """仅在首次访问该群时读取文件"""
+        rooms = self._groups.get(group_id)
+        if rooms is None:
+            rooms = self._read_group_file(group_id)
+            self._groups[group_id] = rooms
+        return rooms
+
+    def _mark_dirty(self, group_id: str):
+        self._dirty_groups.add(group_id)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._flush_handle = loop.call_later(config.data_flush_delay, self._start_flush)
+
+    def _start_flush(self):
+        self._flush_handle = None
+        task = asyncio.create_task(self.flush_async())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    def _take_dirty(self) -> Dict[str, bytes]:
+        """取出所有脏数据并在当前线程完成序列化，避免写入线程读到正在修改的数据"""
+        dirty_groups, self._dirty_groups = self._dirty_groups, set()
+        with metrics.timer("hullqin_storage_seconds", op="serialize"):
+            return {group_id: rooms_to_json(self._groups[group_id]) for group_id in dirty_groups}
+
+    def flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        catalog, self._pending_catalog = self._pending_catalog, None
+        if catalog is not None:
+            self._write_catalog_file(catalog)
+        for group_id, data in self._take_dirty().items():
+            try:
+                with metrics.timer("hullqin_storage_seconds", op="write_group"):
+                    _atomic_write(self.get_group_file_path(group_id), data)
+            except OSError as e:
+                logger.error(f"写入群 {group_id} 数据失败: {e!r}")
+                self._dirty_groups.add(group_id)
+
+    async def flush_async(self):
+        async with self._flush_lock:
+            catalog, self._pending_catalog = self._pending_catalog, None
+            if catalog is not None:
+                await asyncio.to_thread(self._write_catalog_file, catalog)
+            for group_id, data in self._take_dirty().items():
+                try:
+                    with metrics.timer("hullqin_storage_seconds", op="write_group"):
+                        await asyncio.to_thread(_atomic_write, self.get_group_file_path(group_id), data)
+                except OSError as e:
+                    logger.error(f"写入群 {group_id} 数据失败: {e!r}")
+                    self._dirty_groups.add(group_id)
+            if self._dirty_groups or self._pending_catalog is not None:
+                self._schedule_flush()
+
+    def close(self):
+        self.flush()
+        if self._process_lock is not None:
+            self._process_lock.close()
+            self._process_lock = None
+
+    @_reads_files("group")
+    def get_rooms(self, group_id: str) -> List[Room]:
+        # 内存中的列表会被原地修改，调用方可能跨 await 使用结果，与 SQLite 一样返回副本
+        return list(self._load_group(group_id))
+
+    def replace_rooms(self, group_id: str, rooms: List[Room]):
+        self._groups[group_id] = list(rooms)
+        self._mark_dirty(group_id)
+
+    @_reads_files("group")
+    def add_room(self, group_id: str, room: Room):
+        self._load_group(group_id).append(room)
+        self._mark_dirty(group_id)
+
+    @_reads_files("group")
+    def add_rooms(self, group_id: str, rooms: List[Room]):
+        self._load_group(group_id).extend(rooms)
+        self._mark_dirty(group_id)
+
+    @_reads_files("group")
+    def remove_room(self, group_id: str, game_id: str, room_id: str) -> bool:
+        rooms = self._load_group(group_id)
+        for i, room in enumerate(rooms):
+            if room.game_id == game_id and room.room_id == room_id:
+                del rooms[i]
+                self._mark_dirty(group_id)
+                return True
+        return False
+
+    @_reads_files("group")
+    def remove_rooms(self, group_id: str, keys: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        rooms = self._load_group(group_id)
+        pending = set(keys)
+        removed: List[Tuple[str, str]] = []
+        kept: List[Room] = []
+        for room in rooms:
+            if room.key in pending:
+                pending.discard(room.key)
+                removed.append(room.key)
+            else:
+                kept.append(room)
+        if removed:
+            rooms[:] = kept
+            self._mark_dirty(group_id)
+        return removed
+
+    @_reads_files("group")
+    def remove_room_at(self, group_id: str, index: int) -> bool:
+        rooms = self._load_group(group_id)
+        if 0 <= index < len(rooms):
+            rooms.pop(index)
+            self._mark_dirty(group_id)
+            return True
+        return False
+
+    @_reads_files("group")
+    def room_exists(self, group_id: str, game_id: str, room_id: str) -> bool:
+        return any(room.game_id == game_id and room.room_id == room_id for room in self._load_group(group_id))
+
+    @_reads_files("group")
+    def remove_expired(self, group_id: str, now: int) -> int:
+        rooms = self._load_group(group_id)
+        kept = [room for room in rooms if now < room.expired_time]
+        removed = len(rooms) - len(kept)
+        if removed:
+            rooms[:] = kept
+            self._mark_dirty(group_id)
+        return removed
+
+    def iter_all_rooms(self) -> Iterator[Tuple[str, Room]]:
+        self._load_all_groups()
+        for group_id, rooms in list(self._groups.items()):
+            for room in list(rooms):
+                yield group_id, room
+
+    @_reads_files("all")
+    def all_rooms(self) -> List[Tuple[str, Room]]:
+        return list(self.iter_all_rooms())
+
+    @_reads_files("all")
+    def room_held(self, game_id: str, room_id: str) -> bool:
+        # 首次调用时读入所有群（经 run 调用时在线程中读取），之后只需检查内存
+        self._load_all_groups()
+        return any(
+            room.game_id == game_id and room.room_id == room_id
+            for rooms in self._groups.values()
+            for room in rooms
+        )
+
+    @_reads_files("all")
+    def groups_holding(self, game_id: str, room_id: str) -> List[str]:
+        self._load_all_groups()
+        return [
+            group_id
+            for group_id, rooms in self._groups.items()
+            if any(room.game_id == game_id and room.room_id == room_id for room in rooms)
+        ]
+
+    @_reads_files("all")
+    def extend_room(self, game_id: str, room_id: str, expired_time: int, before: int) -> List[str]:
+        self._load_all_groups()
+        group_ids: List[str] = []
+        for group_id, rooms in self._groups.items():
+            for room in rooms:
+                if room.game_id == game_id and room.room_id == room_id and room.expired_time < before:
+                    room.expired_time = expired_time
+                    if not group_ids or group_ids[-1] != group_id:
+                        group_ids.append(group_id)
+                        self._mark_dirty(group_id)
+        return group_ids
+
+
+class SqliteStorage(BaseStorage):
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rooms (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        group_id TEXT NOT NULL,
+        game_id TEXT NOT NULL,
+        room_id TEXT NOT NULL,
+        expired_time INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_rooms_group_game_room ON rooms (group_id, game_id, room_id);
+    CREATE INDEX IF NOT EXISTS idx_rooms_expired_time ON rooms (expired_time);
+    CREATE INDEX IF NOT EXISTS idx_rooms_game_room ON rooms (game_id, room_id);
+    CREATE TABLE IF NOT EXISTS catalog (
+        game_id TEXT PRIMARY KEY,
+        game_name TEXT NOT NULL,
+        rule_link TEXT NOT NULL,
+        position INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        # 连接在工作线程中使用，同一时间只执行一个操作
+        self._lock = threading.Lock()
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.to_thread(self._run_locked, fn, *args)
+
+    def _run_locked(self, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            return fn(*args)
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def load_catalog(self) -> Dict[str, Union[int, List[Dict[str, str]]]]:
+        games_data = empty_games_data()
+        for row in self._conn.execute("SELECT key, value FROM meta WHERE key LIKE 'catalog.%'"):
+            games_data[row["key"][len("catalog."):]] = json.loads(row["value"])
+        games_data["games"] = [
+            {"game_name": row["game_name"], "game_id": row["game_id"], "rule_link": row["rule_link"]}
+            for row in self._conn.execute("SELECT game_id, game_name, rule_link FROM catalog ORDER BY position")
+        ]
+        return games_data
+
+    def save_catalog(self, games_data: Dict[str, Union[int, List[Dict[str, str]]]]):
+        with self._conn:
+            self._write_catalog(games_data)
+
+    def _write_catalog(self, games_data: Dict[str, Union[int, List[Dict[str, str]]]]):
+        self._conn.execute("DELETE FROM catalog")
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO catalog (game_id, game_name, rule_link, position) VALUES (?, ?, ?, ?)",
+            [
+                (game["game_id"], game["game_name"], game.get("rule_link", "无"), position)
+                for position, game in enumerate(games_data.get("games", []))
+            ],
+        )
+        self._conn.execute("DELETE FROM meta WHERE key LIKE 'catalog.%'")
+        for key, value in games_data.items():
+            if key != "games":
+                self._set_meta(f"catalog.{key}", json.dumps(value, ensure_ascii=False))
+
+    def get_rooms(self, group_id: str) -> List[Room]:
+        return [
+            Room(row[0], row[1], row[2])
+            for row in self._conn.execute(
+                "SELECT game_id, room_id, expired_time FROM rooms WHERE group_id = ? ORDER BY id",
+                (group_id,),
+            )
+        ]
+
+    def _insert_rooms(self, group_id: str, rooms: List[Room]):
+        self._conn.executemany(
+            "INSERT INTO rooms (group_id, game_id, room_id, expired_time) VALUES (?, ?, ?, ?)",
+            [(group_id, room.game_id, room.room_id, int(room.expired_time)) for room in rooms],
+        )
+
+    def replace_rooms(self, group_id: str, rooms: List[Room]):
+        with self._conn:
+            self._conn.execute("DELETE FROM rooms WHERE group_id = ?", (group_id,))
+            self._insert_rooms(group_id, rooms)
+
+    def add_room(self, group_id: str, room: Room):
+        with self._conn:
+            self._insert_rooms(group_id, [room])
+
+    def add_rooms(self, group_id: str, rooms: List[Room]):
+        with self._conn:
+            self._insert_rooms(group_id, rooms)
+
+    def remove_room(self, group_id: str, game_id: str, room_id: str) -> bool:
+        with self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM rooms WHERE id = ("
+                "SELECT id FROM rooms WHERE group_id = ? AND game_id = ? AND room_id = ? ORDER BY id LIMIT 1)",
+                (group_id, game_id, room_id),
+            )
+        return cursor.rowcount > 0
+
+    def remove_rooms(self, group_id: str, keys: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        removed: List[Tuple[str, str]] = []
+        with self._conn:
+            for game_id, room_id in dict.fromkeys(keys):
+                cursor = self._conn.execute(
+                    "DELETE FROM rooms WHERE id = ("
+                    "SELECT id FROM rooms WHERE group_id = ? AND game_id = ? AND room_id = ? ORDER BY id LIMIT 1)",
+                    (group_id, game_id, room_id),
+                )
+                if cursor.rowcount > 0:
+                    removed.append((game_id, room_id))
+        return removed
+
+    def remove_room_at(self, group_id: str, index: int) -> bool:
+        if index < 0:
+            return False
+        with self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM rooms WHERE id = ("
+                "SELECT id FROM rooms WHERE group_id = ? ORDER BY id LIMIT 1 OFFSET ?)",
+                (group_id, index),
+            )
+        return cursor.rowcount > 0
+
+    def room_exists(self, group_id: str, game_id: str, room_id: str) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM rooms WHERE group_id = ? AND game_id = ? AND room_id = ? LIMIT 1",
+            (group_id, game_id, room_id),
+        ).fetchone()
+        return row is not None
+
+    def remove_expired(self, group_id: str, now: int) -> int:
+        with self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM rooms WHERE group_id = ? AND expired_time <= ?",
+                (group_id, now),
+            )
+        return cursor.rowcount
+
+    def iter_all_rooms(self) -> Iterator[Tuple[str, Room]]:
+        rows = self._conn.execute("SELECT group_id, game_id, room_id, expired_time FROM rooms ORDER BY id").fetchall()
+        for row in rows:
+            yield row[0], Room(row[1], row[2], row[3])
+
+    def room_held(self, game_id: str, room_id: str) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM rooms WHERE game_id = ? AND room_id = ? LIMIT 1",
+            (game_id, room_id),
+        ).fetchone()
+        return row is not None
+
+    def groups_holding(self, game_id: str, room_id: str) -> List[str]:
+        return [
+            row["group_id"]
+            for row in self._conn.execute(
+                "SELECT DISTINCT group_id FROM rooms WHERE game_id = ? AND room_id = ?",
+                (game_id, room_id),
+            )
+        ]
+
+    def extend_room(self, game_id: str, room_id: str, expired_time: int, before: int) -> List[str]:
+        with self._conn:
+            group_ids = [
+                row["group_id"]
+                for row in self._conn.execute(
+                    "SELECT DISTINCT group_id FROM rooms WHERE game_id = ? AND room_id = ? AND expired_time < ?",
+                    (game_id, room_id, before),
+                )
+            ]
+            if group_ids:
+                self._conn.execute(
+                    "UPDATE rooms SET expired_time = ? WHERE game_id = ? AND room_id = ? AND expired_time < ?",
+                    (expired_time, game_id, room_id, before),
+                )
+        return group_ids
+
+    def close(self):
+        self._conn.close()
+
+    def migrate_from_json(self, data_path: Path):
+        """一次性导入旧版 JSON 数据，导入后原文件保留不动"""
+        if self._get_meta("migrated_from_json") is not None:
+            return
+        group_count = 0
+        room_count = 0
+        with self._conn:
+            # 多个进程同时启动时，先取得写锁再确认一次，只有一个进程执行导入
+            self._conn.execute("BEGIN IMMEDIATE")
+            if self._get_meta("migrated_from_json") is not None:
+                return
+            games_data = _read_json(data_path / "games_data.json")
+            if games_data and games_data.get("games"):
+                self._write_catalog(games_data)
+            for group_file in data_path.glob("*.json"):
+                if not GROUP_FILE_PATTERN.match(group_file.name):
+                    continue
+                group_id = group_file.stem
+                rooms = rooms_from_json(_read_json(group_file))
+                self._conn.execute("DELETE FROM rooms WHERE group_id = ?", (group_id,))
+                self._insert_rooms(group_id, rooms)
+                group_count += 1
+                room_count += len(rooms)
+            self._set_meta("migrated_from_json", str(int(time.time())))
+        logger.info(f"已从 JSON 迁移 {group_count} 个群的 {room_count} 个房间到 SQLite")
+
+
+def create_storage(data_path: Path) -> BaseStorage:
+    """根据配置创建存储后端"""
+    data_path.mkdir(parents=True, exist_ok=True)
+    if config.storage_backend == "sqlite":
+        storage = SqliteStorage(data_path / "hullqin_game.db")
+        storage.migrate_from_json(data_path)
+        return storage
+    return JsonStorage(data_path)
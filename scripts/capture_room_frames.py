@@ -0,0 +1,69 @@
+"""
+连接房间 websocket，把收到的二进制帧原样保存为 .bin 文件，供 tests/test_room_decoder.py 与
+benchmarks/check_room_decoder.py --frames 做快速解码与 ws_pb2 的对照。
+
+地址与请求头与插件连接房间时相同，可以用 HULLQIN_WS_URL / HULLQIN_HOME_URL 环境变量改为其他服务：
+
+    python scripts/capture_room_frames.py hitler/12345 hitler/23456 --out tests/fixtures/room_frames
+"""
+import argparse
+import asyncio
+import sys
+
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+async def capture(rooms: List[str], out: Path, frames: int, timeout: float) -> int:
+    import aiohttp
+    import nonebot
+
+    nonebot.init(driver="~none", room_pool_size=0)
+    nonebot.load_plugin("nonebot_plugin_hullqin_game")
+
+    from nonebot_plugin_hullqin_game.utils.room_ws_fetcher import WS_ORIGIN, random_gid, room_ws_request
+
+    out.mkdir(parents=True, exist_ok=True)
+    saved = 0
+    async with aiohttp.ClientSession() as session:
+        for room in rooms:
+            game_id, _, room_id = room.partition("/")
+            ws_url, headers = room_ws_request(game_id, room_id, random_gid())
+            try:
+                ws = await asyncio.wait_for(session.ws_connect(ws_url, origin=WS_ORIGIN, headers=headers), timeout)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"连接 {room} 失败: {e!r}", file=sys.stderr)
+                continue
+            try:
+                count = 0
+                while count < frames:
+                    try:
+                        message = await ws.receive(timeout=timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if message.type != aiohttp.WSMsgType.BINARY:
+                        break
+                    path = out / f"{game_id}_{room_id}_{count}.bin"
+                    path.write_bytes(message.data)
+                    count += 1
+                    saved += 1
+                print(f"{room}: 保存 {count} 帧")
+            finally:
+                await ws.close()
+    return 0 if saved else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("rooms", nargs="+", help="<游戏ID>/<房间号>")
+    parser.add_argument("--out", type=Path, default=Path("tests/fixtures/room_frames"))
+    parser.add_argument("--frames", type=int, default=3, help="每个房间最多保存的帧数")
+    parser.add_argument("--timeout", type=float, default=5.0, help="连接与等待下一帧的超时（秒）")
+    args = parser.parse_args()
+    return asyncio.run(capture(args.rooms, args.out, args.frames, args.timeout))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
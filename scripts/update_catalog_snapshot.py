@@ -0,0 +1,76 @@
+"""
+从 hullqin 抓取游戏列表，更新随插件发布的 nonebot_plugin_hullqin_game/catalog_snapshot.json。
+
+发布流程在打包前自动运行，抓取失败或快照为空、过旧时发布失败；也可以手动运行后提交快照：
+
+    python scripts/update_catalog_snapshot.py
+    # 只检查已提交的快照，不联网
+    python scripts/update_catalog_snapshot.py --check --max-age-days 30
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def check_snapshot(path: Path, max_age_days: float) -> int:
+    """快照为空或生成时间早于 max_age_days 天前时返回 1"""
+    try:
+        snapshot = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        print(f"读取 {path.name} 失败: {e!r}", file=sys.stderr)
+        return 1
+    games = snapshot.get("games") or []
+    if not games or not snapshot.get("version"):
+        print(f"{path.name} 为空，请在能访问 hullqin 的环境中运行本脚本生成快照", file=sys.stderr)
+        return 1
+    age_days = (time.time() - snapshot.get("generated_at", 0)) / 86400
+    if age_days > max_age_days:
+        print(f"{path.name} 已生成 {age_days:.0f} 天，超过 {max_age_days:g} 天，请重新生成", file=sys.stderr)
+        return 1
+    print(f"{path.name} 版本 {snapshot['version']}，共 {len(games)} 个游戏，生成于 {age_days:.1f} 天前")
+    return 0
+
+
+async def update() -> int:
+    import nonebot
+
+    nonebot.init(driver="~none", room_pool_size=0)
+    nonebot.load_plugin("nonebot_plugin_hullqin_game")
+
+    from nonebot_plugin_hullqin_game.utils.catalog_snapshot import SNAPSHOT_PATH, write_snapshot
+    from nonebot_plugin_hullqin_game.utils.game_scraper import game_scraper
+
+    try:
+        games_data = await game_scraper.get_games_data()
+    finally:
+        await game_scraper.close()
+    if not games_data.get("games"):
+        print("未获取到游戏列表，保留原有快照", file=sys.stderr)
+        return 1
+    version = write_snapshot(games_data)
+    print(f"已写入 {SNAPSHOT_PATH.name}，版本 {version}，共 {len(games_data['games'])} 个游戏")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="只检查已提交的快照，不联网更新")
+    parser.add_argument("--max-age-days", type=float, default=30, help="快照允许的最长生成时间（天）")
+    args = parser.parse_args()
+
+    snapshot_path = Path(__file__).resolve().parent.parent / "nonebot_plugin_hullqin_game" / "catalog_snapshot.json"
+    if not args.check:
+        code = asyncio.run(update())
+        if code:
+            return code
+    return check_snapshot(snapshot_path, args.max_age_days)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.fixture(scope="session")
+def plugin(tmp_path_factory):
+    """初始化 nonebot 并加载插件，数据目录位于临时目录，不启动驱动"""
+    import nonebot
+
+    nonebot.init(
+        driver="~none",
+        localstore_config_dir=str(tmp_path_factory.mktemp("localstore")),
+        room_pool_size=0,
+    )
+    return nonebot.load_plugin("nonebot_plugin_hullqin_game")
@@ -0,0 +1,52 @@
+"""查车逐步发送期间群内房间被移除的回归测试"""
+import asyncio
+import re
+
+
+def test_rooms_removed_mid_query_keep_their_lines(plugin, monkeypatch) -> None:
+    from nonebot_plugin_hullqin_game.commands import query_games
+    from nonebot_plugin_hullqin_game.config import config
+    from nonebot_plugin_hullqin_game.utils.game_scraper import game_scraper
+    from nonebot_plugin_hullqin_game.utils.room_record import Room
+
+    monkeypatch.setattr(config, "query_first_wait", 0.05)
+    monkeypatch.setattr(config, "query_update_interval", 0.05)
+    monkeypatch.setattr(config, "query_deadline", 2.0)
+
+    def probe_rooms(rooms, concurrency=None):
+        async def _probe(index, room_id):
+            # 第一个房间很快返回，其余在房间被移除之后才返回
+            await asyncio.sleep(0.01 if index == 0 else 0.3)
+            return {"current": 1, "total": 4, "players": [room_id]}
+
+        return [asyncio.ensure_future(_probe(i, room_id)) for i, (_, room_id) in enumerate(rooms)]
+
+    sent_lines = []
+
+    async def send_lines(bot, event, message_lines):
+        sent_lines.extend(message_lines)
+
+    async def send(message):
+        pass
+
+    monkeypatch.setattr(game_scraper, "probe_rooms", probe_rooms)
+    monkeypatch.setattr(query_games, "send_lines", send_lines)
+    monkeypatch.setattr(query_games.query_games, "send", send)
+
+    # JSON 后端曾把存储中的列表直接交给调用方，封车或过期会原地修改它
+    room_list = [Room("uno", f"room{i}", 0) for i in range(4)]
+
+    async def main() -> None:
+        query = asyncio.ensure_future(query_games.send_rooms_progressively(None, None, room_list))
+        await asyncio.sleep(0.1)
+        del room_list[1:3]
+        await query
+
+    asyncio.run(main())
+
+    rendered = {}
+    for line in sent_lines:
+        match = re.match(r"(\d+)\. .*/uno/(room\d+)\n.*玩家列表: (\S+)", line, re.S)
+        if match:
+            rendered[int(match.group(1))] = (match.group(2), match.group(3))
+    assert rendered == {i: (f"room{i}", f"room{i}") for i in range(4)}
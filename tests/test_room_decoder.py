@@ -0,0 +1,34 @@
+"""快速房间帧解码与 ws_pb2 完整解析的差分测试"""
+import sys
+
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from check_room_decoder import FAST, MISMATCH, compare, generate_frames, recorded_frames  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "room_frames"
+RECORDED = list(recorded_frames(FIXTURES))
+
+
+def test_fixtures_present() -> None:
+    assert RECORDED, f"{FIXTURES} 中没有 *.bin 帧"
+
+
+@pytest.mark.parametrize("name,frame", RECORDED, ids=[name for name, _ in RECORDED])
+def test_recorded_frames_use_fast_path(name: str, frame: bytes) -> None:
+    status, detail = compare(frame)
+    assert status == FAST, detail
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_generated_frames_agree(seed: int) -> None:
+    mismatches = [
+        f"{name}: {detail}"
+        for name, frame in generate_frames(500, seed)
+        for status, detail in [compare(frame)]
+        if status == MISMATCH
+    ]
+    assert not mismatches, "\n".join(mismatches[:10])
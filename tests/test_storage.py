@@ -0,0 +1,85 @@
+"""存储后端的行为一致性"""
+import pytest
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(plugin, request, tmp_path):
+    from nonebot_plugin_hullqin_game.utils.storage import JsonStorage, SqliteStorage
+
+    backend = JsonStorage(tmp_path) if request.param == "json" else SqliteStorage(tmp_path / "hullqin_game.db")
+    yield backend
+    backend.close()
+
+
+def test_get_rooms_returns_a_copy(storage) -> None:
+    from nonebot_plugin_hullqin_game.utils.room_record import Room
+
+    storage.add_rooms("1", [Room("uno", f"room{i}", 100 + i) for i in range(4)])
+    rooms = storage.get_rooms("1")
+
+    storage.remove_rooms("1", [("uno", "room1")])
+    storage.remove_room_at("1", 0)
+    storage.remove_expired("1", 102)
+
+    assert [room.room_id for room in rooms] == ["room0", "room1", "room2", "room3"]
+    assert [room.room_id for room in storage.get_rooms("1")] == ["room3"]
+
+
+def test_json_cold_reads_run_off_the_event_loop(plugin, tmp_path, monkeypatch) -> None:
+    import asyncio
+    import threading
+
+    from nonebot_plugin_hullqin_game.utils.room_record import Room
+    from nonebot_plugin_hullqin_game.utils.storage import JsonStorage
+
+    writer = JsonStorage(tmp_path)
+    for group_id in ("1", "2"):
+        writer.add_room(group_id, Room("uno", f"room{group_id}", 100))
+    writer.save_catalog({"expired_time": 0, "games": [{"game_id": "uno", "game_name": "UNO", "rule_link": "无"}]})
+    writer.close()
+
+    storage = JsonStorage(tmp_path)
+    read_threads = []
+    for name in ("_read_group_file", "load_catalog"):
+        original = getattr(storage, name)
+
+        def record(*args, _original=original):
+            read_threads.append(threading.current_thread())
+            return _original(*args)
+
+        record.reads_files = getattr(original, "reads_files", None)
+        monkeypatch.setattr(storage, name, record)
+
+    async def main():
+        assert [room.room_id for room in await storage.run(storage.get_rooms, "1")] == ["room1"]
+        assert (await storage.run(storage.load_catalog))["games"][0]["game_id"] == "uno"
+        assert sorted(group_id for group_id, _ in await storage.run(storage.all_rooms)) == ["1", "2"]
+
+    asyncio.run(main())
+    storage.close()
+    assert len(read_threads) == 3
+    assert threading.main_thread() not in read_threads
+
+
+def test_json_cross_group_lookups_load_unvisited_groups(plugin, tmp_path) -> None:
+    import asyncio
+
+    from nonebot_plugin_hullqin_game.utils.room_record import Room
+    from nonebot_plugin_hullqin_game.utils.storage import JsonStorage
+
+    writer = JsonStorage(tmp_path)
+    writer.add_room("1", Room("uno", "held", 100))
+    writer.close()
+
+    async def main():
+        # 预热未登记已有房间时，没访问过的群同样要参与跨群查询
+        storage = JsonStorage(tmp_path)
+        assert await storage.run(storage.room_held, "uno", "held")
+        assert await storage.run(storage.groups_holding, "uno", "held") == ["1"]
+        assert await storage.run(storage.extend_room, "uno", "held", 200, 150) == ["1"]
+        storage.close()
+
+    asyncio.run(main())
+    reader = JsonStorage(tmp_path)
+    assert reader.get_rooms("1")[0].expired_time == 200
+    reader.close()